@@ -5,12 +5,13 @@ from typing import Any, Dict
 
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.helpers import config_validation as cv
 from homeassistant.exceptions import HomeAssistantError, ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from .const import (
     DOMAIN,
@@ -18,8 +19,6 @@ from .const import (
     CONF_ENDPOINT,
     CONF_CLUSTER,
     CONF_ROOM_NAME,
-    DEFAULT_CLUSTER_TYPE,
-    DEFAULT_COMMAND_TYPE,
     SERVICE_LEARN_COMMAND,
     SERVICE_SEND_CODE,
     SERVICE_SEND_COMMAND,
@@ -34,108 +33,119 @@ from .const import (
     ATTR_CODE,
     ATTR_DEVICE_NAME,
     ATTR_COMMAND_NAME,
+    ERROR_LEARN_TIMEOUT,
+    LEARN_TIMEOUT,
     ZHA_COMMAND_LEARN,
-    ZHA_COMMAND_SEND,
+    ZHA_MAX_CONCURRENT_COMMANDS,
+    SIGNAL_COMMAND_ADDED,
+    SIGNAL_DEVICE_ADDED,
+    DATA_STORAGE,
+    DATA_ENTRIES,
     MANUFACTURER,
     MODEL_CONTROLLER,
     MODEL_VIRTUAL_DEVICE,
     DEVICE_TYPE_LIGHT,
 )
-from .data import IRRemoteStorage
+from .data import IRRemoteStorage, async_get_storage, name_to_id
+from .helpers import (
+    async_fire_zha_code,
+    async_read_previous_code,
+    async_schedule_entry_reload,
+    async_wait_for_learned_code,
+    build_zha_send_base,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 # Platforms to load - добавлен LIGHT!
-PLATFORMS = [Platform.BUTTON, Platform.LIGHT, Platform.MEDIA_PLAYER, Platform.CLIMATE]
+PLATFORMS = (Platform.BUTTON, Platform.LIGHT, Platform.MEDIA_PLAYER, Platform.CLIMATE)
 
 # Config schema - integration only works with config entries
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-# Service schemas
+# Service schemas (vol.Schema rejects extra keys by default)
+NON_EMPTY_STRING = vol.All(cv.string, vol.Length(min=1))
+
 LEARN_COMMAND_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE): cv.string,
-    vol.Required(ATTR_COMMAND): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE): NON_EMPTY_STRING,
+    vol.Required(ATTR_COMMAND): NON_EMPTY_STRING,
 })
 
 SEND_CODE_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_CODE): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_CODE): NON_EMPTY_STRING,
 })
 
 SEND_COMMAND_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE): cv.string,
-    vol.Required(ATTR_COMMAND): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE): NON_EMPTY_STRING,
+    vol.Required(ATTR_COMMAND): NON_EMPTY_STRING,
 })
 
 ADD_DEVICE_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE_NAME): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE_NAME): NON_EMPTY_STRING,
 })
 
 ADD_COMMAND_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE): cv.string,
-    vol.Required(ATTR_COMMAND_NAME): cv.string,
-    vol.Required(ATTR_CODE): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE): NON_EMPTY_STRING,
+    vol.Required(ATTR_COMMAND_NAME): NON_EMPTY_STRING,
+    vol.Required(ATTR_CODE): NON_EMPTY_STRING,
 })
 
 REMOVE_DEVICE_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE): NON_EMPTY_STRING,
 })
 
 REMOVE_COMMAND_SCHEMA = vol.Schema({
-    vol.Required(ATTR_CONTROLLER_ID): cv.string,
-    vol.Required(ATTR_DEVICE): cv.string,
-    vol.Required(ATTR_COMMAND): cv.string,
+    vol.Required(ATTR_CONTROLLER_ID): NON_EMPTY_STRING,
+    vol.Required(ATTR_DEVICE): NON_EMPTY_STRING,
+    vol.Required(ATTR_COMMAND): NON_EMPTY_STRING,
 })
 
 GET_DATA_SCHEMA = vol.Schema({
     vol.Optional(ATTR_CONTROLLER_ID): cv.string,
 })
 
+# All services: name -> (schema, supports_response).
+# Drives both registration in _register_services and removal on unload.
+SERVICES = {
+    SERVICE_LEARN_COMMAND: (LEARN_COMMAND_SCHEMA, SupportsResponse.NONE),
+    SERVICE_SEND_CODE: (SEND_CODE_SCHEMA, SupportsResponse.NONE),
+    SERVICE_SEND_COMMAND: (SEND_COMMAND_SCHEMA, SupportsResponse.NONE),
+    SERVICE_ADD_DEVICE: (ADD_DEVICE_SCHEMA, SupportsResponse.NONE),
+    SERVICE_ADD_COMMAND: (ADD_COMMAND_SCHEMA, SupportsResponse.NONE),
+    SERVICE_REMOVE_DEVICE: (REMOVE_DEVICE_SCHEMA, SupportsResponse.NONE),
+    SERVICE_REMOVE_COMMAND: (REMOVE_COMMAND_SCHEMA, SupportsResponse.NONE),
+    SERVICE_GET_DATA: (GET_DATA_SCHEMA, SupportsResponse.OPTIONAL),
+}
+
 
 async def async_setup(hass: HomeAssistant, config: Dict[str, Any]) -> bool:
     """Set up the IR Remote component."""
-    _LOGGER.info("Setting up IR Remote integration")
+    _LOGGER.debug("Setting up IR Remote integration")
     
-    # Initialize domain data
-    hass.data.setdefault(DOMAIN, {})
+    # Initialize domain data and load the storage shared by all entries
+    hass.data.setdefault(DOMAIN, {}).setdefault(DATA_ENTRIES, {})
+    await async_get_storage(hass)
     
     # НЕ регистрируем сервисы здесь - они будут регистрироваться в async_setup_entry
     
-    _LOGGER.info("IR Remote integration setup completed")
+    _LOGGER.debug("IR Remote integration setup completed")
     return True
 
 
-def _is_real_controller_entry(entry_data: Dict[str, Any]) -> bool:
-    """Check if config entry is a real controller (not temporary from config flow)."""
-    if not isinstance(entry_data, dict):
-        return False
-    
-    # Проверяем, что это не временная запись из config flow
-    config = entry_data.get("config", {})
-    if config.get("action") in ["device_added", "command_learning_started"]:
-        return False
-    
-    # Проверяем, что есть storage
-    return "storage" in entry_data
-
-
 def _count_active_controllers(hass: HomeAssistant) -> int:
-    """Count active controller entries (excluding temporary config flow entries)."""
-    count = 0
-    for entry_data in hass.data.get(DOMAIN, {}).values():
-        if _is_real_controller_entry(entry_data):
-            count += 1
-    return count
+    """Count loaded controller entries (temporary config flow entries are never stored)."""
+    return len(hass.data[DOMAIN][DATA_ENTRIES])
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up IR Remote from a config entry."""
-    _LOGGER.info("Setting up IR Remote entry: %s", entry.title)
+    _LOGGER.debug("Setting up IR Remote entry: %s", entry.title)
     
     # Check ZHA availability
     if "zha" not in hass.data:
@@ -150,8 +160,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         return True
     
     # Initialize storage for this controller
-    storage = IRRemoteStorage(hass)
-    await storage.async_load()
+    storage = await async_get_storage(hass)
     
     # Add controller to storage if not exists
     controller_id = entry.entry_id
@@ -160,11 +169,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     endpoint_id = entry.data.get(CONF_ENDPOINT, 1)
     cluster_id = entry.data.get(CONF_CLUSTER, 57348)
     
-    # Add controller if not exists
-    controllers = storage.get_controllers()
-    controller_exists = any(c["id"] == controller_id for c in controllers)
-    
-    if not controller_exists:
+    # Add controller if not exists (direct dict lookup, no summary list)
+    if storage.get_controller(controller_id) is None:
         success = await storage.async_add_controller(
             controller_id, ieee, room_name, endpoint_id, cluster_id
         )
@@ -173,9 +179,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             return False
     
     # Store data for this entry
-    hass.data[DOMAIN][entry.entry_id] = {
+    hass.data[DOMAIN][DATA_ENTRIES][entry.entry_id] = {
         "storage": storage,
         "config": entry.data,
+        "zha_send_base": build_zha_send_base(storage.get_controller(controller_id)),
+        # Bounds parallel ZHA calls so bulk automations don't flood the radio
+        "zha_semaphore": asyncio.Semaphore(ZHA_MAX_CONCURRENT_COMMANDS),
     }
     
     # Регистрируем сервисы только при добавлении первого реального контроллера
@@ -183,19 +192,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     _LOGGER.debug("Active controllers count: %d", active_controllers_count)
     
     if active_controllers_count == 1:
-        _LOGGER.info("Registering IR Remote services (first controller)")
-        await _register_services(hass)
+        _LOGGER.debug("Registering IR Remote services (first controller)")
+        _register_services(hass)
     else:
         _LOGGER.debug("Services already registered, skipping registration")
     
-    # Register device
-    await _register_ir_controller_device(hass, entry)
-    
-    # Setup event handler for ZHA events
-    await _setup_zha_event_handler(hass, entry)
+    # Register device (one registry handle for the controller and its virtual devices)
+    device_registry = dr.async_get(hass)
+    _register_ir_controller_device(device_registry, entry)
     
     # Create virtual devices
-    await _create_virtual_devices(hass, entry, storage)
+    _create_virtual_devices(device_registry, entry, storage)
     
     # Migrate old Universal devices to Light type
     _LOGGER.debug("Starting migration from Universal to Light")
@@ -204,24 +211,29 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Forward to platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
-    _LOGGER.info("IR Remote entry setup completed: %s", entry.title)
+    _LOGGER.debug("IR Remote entry setup completed: %s", entry.title)
     return True
 
 
-async def _register_services(hass: HomeAssistant) -> None:
+@callback
+def _register_services(hass: HomeAssistant) -> None:
     """Register services for IR Remote."""
     _LOGGER.debug("Starting service registration")
     
+    # hass.data[DOMAIN] is created once in async_setup - handlers close over it
+    domain_data: Dict[str, Any] = hass.data[DOMAIN]
+    entries: Dict[str, Dict[str, Any]] = domain_data[DATA_ENTRIES]
+    
     async def learn_command_service(call: ServiceCall) -> None:
         """Service to learn IR command."""
         controller_id = call.data[ATTR_CONTROLLER_ID]
         device_id = call.data[ATTR_DEVICE]
         command_id = call.data[ATTR_COMMAND]
         
-        _LOGGER.info("Learning command: %s - %s (controller: %s)", device_id, command_id, controller_id)
+        _LOGGER.debug("Learning command: %s - %s (controller: %s)", device_id, command_id, controller_id)
         
         # Get storage and controller
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             return
@@ -237,14 +249,13 @@ async def _register_services(hass: HomeAssistant) -> None:
                      controller["ieee"], controller["endpoint_id"], controller["cluster_id"])
         
         try:
+            # Remember the previous code to detect when a new one is learned
+            previous_code = await async_read_previous_code(hass, controller)
+            
             # Send ZHA command to start learning (always with on_off: true)
             zha_params = {
-                "ieee": controller["ieee"],
-                "endpoint_id": controller["endpoint_id"],
-                "cluster_id": controller["cluster_id"],
-                "cluster_type": DEFAULT_CLUSTER_TYPE,
+                **entry_data["zha_send_base"],
                 "command": ZHA_COMMAND_LEARN,
-                "command_type": DEFAULT_COMMAND_TYPE,
                 "params": {
                     "on_off": True  # Always required for IR learning
                 }
@@ -252,109 +263,62 @@ async def _register_services(hass: HomeAssistant) -> None:
             
             _LOGGER.debug("Sending ZHA learning command with params: %s", zha_params)
             
-            await hass.services.async_call(
-                "zha",
-                "issue_zigbee_cluster_command",
-                zha_params,
-                blocking=True
-            )
-            _LOGGER.info("Learning mode activated for %s - %s", device_id, command_id)
+            async with entry_data["zha_semaphore"]:
+                await hass.services.async_call(
+                    "zha",
+                    "issue_zigbee_cluster_command",
+                    zha_params,
+                    blocking=True
+                )
+            _LOGGER.debug("Learning mode activated for %s - %s", device_id, command_id)
             
             # Wait for user to press the button on original remote
-            await asyncio.sleep(10)
+            ir_code = await async_wait_for_learned_code(hass, controller, previous_code)
             
-            # Read the learned IR code from attribute 0
-            _LOGGER.debug("Reading learned IR code from attribute 0")
-            
-            result = await hass.services.async_call(
-                "zha_toolkit",
-                "attr_read",
-                {
-                    "ieee": controller["ieee"],
-                    "endpoint": controller["endpoint_id"],
-                    "cluster": controller["cluster_id"],
-                    "attribute": 0,
-                    "use_cache": False
-                },
-                blocking=True,
-                return_response=True
-            )
-            
-            _LOGGER.debug("ZHA toolkit response: %s", result)
-            
-            ir_code = None
-            if result and "result_read" in result:
-                # result_read is a tuple: (dict_with_attributes, dict_with_other_data)
-                result_read = result["result_read"]
-                if isinstance(result_read, (list, tuple)) and len(result_read) > 0:
-                    attributes_dict = result_read[0]
-                    if isinstance(attributes_dict, dict) and 0 in attributes_dict:
-                        ir_code = attributes_dict[0]
-                        _LOGGER.info("Successfully read IR code from attribute 0 (length: %d)", len(str(ir_code)))
-            
-            if ir_code:
-                # Save the learned code
-                success = await storage.async_add_command(
-                    controller_id, device_id, command_id, command_id, str(ir_code)
-                )
-                
-                if success:
-                    _LOGGER.info("Successfully saved learned command: %s - %s", device_id, command_id)
-                    # Reload config entry to create button entity and update media player
-                    config_entry = hass.config_entries.async_get_entry(controller_id)
-                    if config_entry:
-                        await hass.config_entries.async_reload(controller_id)
-                else:
-                    _LOGGER.error("Failed to save learned command")
-                    raise HomeAssistantError("Failed to save learned command")
-            else:
-                _LOGGER.error("No IR code found in response. Full response: %s", result)
-                raise HomeAssistantError("No IR code received during learning")
-                
-        except Exception as e:
-            _LOGGER.error("Failed to learn IR command: %s", e, exc_info=True)
+        except (HomeAssistantError, vol.Invalid) as e:
+            _LOGGER.error("Failed to learn IR command: %s", e)
             raise HomeAssistantError(f"Failed to learn IR command: {e}") from e
+        
+        # Raised outside the try so the errors below are logged and reported once
+        if not ir_code:
+            _LOGGER.error("No new IR code in attribute 0 within %d s", LEARN_TIMEOUT)
+            raise HomeAssistantError(
+                f"No IR code received within {LEARN_TIMEOUT} s ({ERROR_LEARN_TIMEOUT})"
+            )
+        
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Successfully read IR code from attribute 0 (length: %d)", len(ir_code))
+        
+        # Save the learned code
+        success = await storage.async_add_command(
+            controller_id, device_id, command_id, command_id, ir_code
+        )
+        
+        if not success:
+            _LOGGER.error("Failed to save learned command")
+            raise HomeAssistantError("Failed to save learned command")
+        
+        _LOGGER.debug("Successfully saved learned command: %s - %s", device_id, command_id)
+        # Let the platforms add the button and refresh dependent entities
+        async_dispatcher_send(
+            hass, SIGNAL_COMMAND_ADDED.format(controller_id), device_id, command_id
+        )
     
     async def send_code_service(call: ServiceCall) -> None:
         """Service to send IR code."""
         controller_id = call.data[ATTR_CONTROLLER_ID]
         code = call.data[ATTR_CODE]
         
-        _LOGGER.debug("Sending IR code (length: %d)", len(code))
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Sending IR code (length: %d)", len(code))
         
         # Get controller config
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             return
         
-        storage = entry_data["storage"]
-        controller = storage.get_controller(controller_id)
-        
-        if not controller:
-            _LOGGER.error("Controller data not found: %s", controller_id)
-            return
-        
-        try:
-            # Send ZHA command
-            await hass.services.async_call(
-                "zha",
-                "issue_zigbee_cluster_command",
-                {
-                    "ieee": controller["ieee"],
-                    "endpoint_id": controller["endpoint_id"],
-                    "cluster_id": controller["cluster_id"],
-                    "cluster_type": DEFAULT_CLUSTER_TYPE,
-                    "command": ZHA_COMMAND_SEND,
-                    "command_type": DEFAULT_COMMAND_TYPE,
-                    "params": {"code": code}
-                },
-                blocking=True
-            )
-            _LOGGER.info("IR code sent successfully")
-        except Exception as e:
-            _LOGGER.error("Failed to send IR code: %s", e)
-            raise HomeAssistantError(f"Failed to send IR code: {e}") from e
+        await async_fire_zha_code(hass, entry_data, code)
     
     async def send_command_service(call: ServiceCall) -> None:
         """Service to send command by name."""
@@ -362,10 +326,10 @@ async def _register_services(hass: HomeAssistant) -> None:
         device_id = call.data[ATTR_DEVICE]
         command_id = call.data[ATTR_COMMAND]
         
-        _LOGGER.info("Sending command: %s - %s", device_id, command_id)
+        _LOGGER.debug("Sending command: %s - %s", device_id, command_id)
         
         # Get storage
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             return
@@ -378,16 +342,8 @@ async def _register_services(hass: HomeAssistant) -> None:
             _LOGGER.error("Command code not found: %s - %s", device_id, command_id)
             return
         
-        # Send the code
-        await hass.services.async_call(
-            DOMAIN,
-            SERVICE_SEND_CODE,
-            {
-                ATTR_CONTROLLER_ID: controller_id,
-                ATTR_CODE: code
-            },
-            blocking=True
-        )
+        # Send the code directly, without re-entering the send_code service
+        await async_fire_zha_code(hass, entry_data, code)
     
     async def add_device_service(call: ServiceCall) -> None:
         """Service to add virtual device."""
@@ -397,7 +353,7 @@ async def _register_services(hass: HomeAssistant) -> None:
         _LOGGER.info("Adding device: %s to controller %s", device_name, controller_id)
         
         # Get storage
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             return
@@ -405,15 +361,13 @@ async def _register_services(hass: HomeAssistant) -> None:
         storage = entry_data["storage"]
         
         # Generate device ID
-        device_id = device_name.lower().replace(" ", "_").replace("-", "_")
+        device_id = name_to_id(device_name)
         
         # Add device with Light type by default
         success = await storage.async_add_device(controller_id, device_id, device_name, DEVICE_TYPE_LIGHT)
         if success:
-            # Reload the config entry to create new entities
-            config_entry = hass.config_entries.async_get_entry(controller_id)
-            if config_entry:
-                await hass.config_entries.async_reload(controller_id)
+            # Let the platforms create the device's entities without a reload
+            async_dispatcher_send(hass, SIGNAL_DEVICE_ADDED.format(controller_id), device_id)
         else:
             _LOGGER.error("Failed to add device: %s", device_name)
     
@@ -427,7 +381,7 @@ async def _register_services(hass: HomeAssistant) -> None:
         _LOGGER.info("Adding command: %s to device %s", command_name, device_id)
         
         # Get storage
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             return
@@ -435,15 +389,15 @@ async def _register_services(hass: HomeAssistant) -> None:
         storage = entry_data["storage"]
         
         # Generate command ID
-        command_id = command_name.lower().replace(" ", "_").replace("-", "_")
+        command_id = name_to_id(command_name)
         
         # Add command
         success = await storage.async_add_command(controller_id, device_id, command_id, command_name, code)
         if success:
-            # Reload the config entry to create new button entity and update media player
-            config_entry = hass.config_entries.async_get_entry(controller_id)
-            if config_entry:
-                await hass.config_entries.async_reload(controller_id)
+            # Let the platforms add the button and refresh dependent entities
+            async_dispatcher_send(
+                hass, SIGNAL_COMMAND_ADDED.format(controller_id), device_id, command_id
+            )
         else:
             _LOGGER.error("Failed to add command: %s", command_name)
     
@@ -455,7 +409,7 @@ async def _register_services(hass: HomeAssistant) -> None:
         _LOGGER.info("Removing device: %s from controller %s", device_id, controller_id)
 
         # Get storage
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             raise HomeAssistantError(f"Controller {controller_id} not found")
@@ -471,14 +425,12 @@ async def _register_services(hass: HomeAssistant) -> None:
             _LOGGER.info("Successfully removed device: %s", device_id)
 
             # Clean up entities from Entity Registry
-            await _cleanup_device_entities(hass, controller_id, device_id, commands)
+            _cleanup_device_entities(hass, controller_id, device_id, commands)
 
             # Clean up device from Device Registry
-            await _cleanup_virtual_device(hass, controller_id, device_id)
+            _cleanup_virtual_device(hass, controller_id, device_id)
             # Reload integration to update entities
-            config_entry = hass.config_entries.async_get_entry(controller_id) 
-            if config_entry:
-                await hass.config_entries.async_reload(controller_id)
+            async_schedule_entry_reload(hass, controller_id)
                 
         else:
             _LOGGER.error("Failed to remove device: %s", device_id)
@@ -493,7 +445,7 @@ async def _register_services(hass: HomeAssistant) -> None:
         _LOGGER.info("Removing command: %s from device %s", command_id, device_id)
 
         # Get storage
-        entry_data = hass.data[DOMAIN].get(controller_id)
+        entry_data = entries.get(controller_id)
         if not entry_data:
             _LOGGER.error("Controller %s not found", controller_id)
             raise HomeAssistantError(f"Controller {controller_id} not found")
@@ -506,11 +458,9 @@ async def _register_services(hass: HomeAssistant) -> None:
             _LOGGER.info("Successfully removed command: %s", command_id)
 
             # Clean up entity from Entity Registry
-            await _cleanup_command_entity(hass, controller_id, device_id, command_id)
+            _cleanup_command_entity(hass, controller_id, device_id, command_id)
             # Reload integration to update entities (including media player source list)
-            config_entry = hass.config_entries.async_get_entry(controller_id)
-            if config_entry:
-                await hass.config_entries.async_reload(controller_id)
+            async_schedule_entry_reload(hass, controller_id)
 
         else:
             _LOGGER.error("Failed to remove command: %s", command_id)
@@ -522,7 +472,7 @@ async def _register_services(hass: HomeAssistant) -> None:
         
         if controller_id:
             # Get data for specific controller
-            entry_data = hass.data[DOMAIN].get(controller_id)
+            entry_data = entries.get(controller_id)
             if not entry_data:
                 return {"error": "Controller not found"}
             
@@ -530,58 +480,43 @@ async def _register_services(hass: HomeAssistant) -> None:
             controller = storage.get_controller(controller_id)
             return {"controller": controller}
         else:
-            # Get data for all controllers
-            all_data = {}
-            for entry_id, entry_data in hass.data[DOMAIN].items():
-                if _is_real_controller_entry(entry_data):
-                    storage = entry_data["storage"]
-                    controllers = storage.get_controllers()
-                    all_data[entry_id] = controllers
-            return all_data
-    
-    # Register services
-    services_to_register = [
-        (SERVICE_LEARN_COMMAND, learn_command_service, LEARN_COMMAND_SCHEMA),
-        (SERVICE_SEND_CODE, send_code_service, SEND_CODE_SCHEMA),
-        (SERVICE_SEND_COMMAND, send_command_service, SEND_COMMAND_SCHEMA),
-        (SERVICE_ADD_DEVICE, add_device_service, ADD_DEVICE_SCHEMA),
-        (SERVICE_ADD_COMMAND, add_command_service, ADD_COMMAND_SCHEMA),
-        (SERVICE_REMOVE_DEVICE, remove_device_service, REMOVE_DEVICE_SCHEMA),
-        (SERVICE_REMOVE_COMMAND, remove_command_service, REMOVE_COMMAND_SCHEMA),
-        (SERVICE_GET_DATA, get_data_service, GET_DATA_SCHEMA),
-    ]
-    
-    for service_name, service_func, schema in services_to_register:
+            # Get data for all controllers (storage is shared - summarize it once).
+            # The summary is cached in storage - hand out copies, never the cached list
+            controllers = domain_data[DATA_STORAGE].get_controllers()
+            return {
+                entry_id: [dict(controller) for controller in controllers]
+                for entry_id in entries
+            }
+    
+    # Handlers are closures - schema and supports_response come from SERVICES
+    handlers = {
+        SERVICE_LEARN_COMMAND: learn_command_service,
+        SERVICE_SEND_CODE: send_code_service,
+        SERVICE_SEND_COMMAND: send_command_service,
+        SERVICE_ADD_DEVICE: add_device_service,
+        SERVICE_ADD_COMMAND: add_command_service,
+        SERVICE_REMOVE_DEVICE: remove_device_service,
+        SERVICE_REMOVE_COMMAND: remove_command_service,
+        SERVICE_GET_DATA: get_data_service,
+    }
+    
+    for service_name, (schema, supports_response) in SERVICES.items():
         if hass.services.has_service(DOMAIN, service_name):
             _LOGGER.debug("Service %s already exists, skipping", service_name)
             continue
         
-        extra_kwargs = {}
-        if service_name == SERVICE_GET_DATA:
-            extra_kwargs["supports_response"] = True
-        
         hass.services.async_register(
-            DOMAIN, service_name, service_func, schema=schema, **extra_kwargs
+            DOMAIN, service_name, handlers[service_name], schema=schema,
+            supports_response=supports_response,
         )
         _LOGGER.debug("Registered service: %s", service_name)
     
-    _LOGGER.info("IR Remote services registration completed")
-
-
-async def _setup_zha_event_handler(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Setup ZHA event handler for IR learning."""
-    # IR learning now uses direct attribute reading instead of events
-    # This function is kept for compatibility but does nothing
-    _LOGGER.debug("ZHA event handler setup (using direct attribute reading)")
-    
-    # Store empty listener remover for compatibility
-    hass.data[DOMAIN][entry.entry_id]["zha_listener"] = lambda: None
+    _LOGGER.debug("IR Remote services registration completed")
 
 
-async def _register_ir_controller_device(hass: HomeAssistant, entry: ConfigEntry) -> None:
+@callback
+def _register_ir_controller_device(device_registry: dr.DeviceRegistry, entry: ConfigEntry) -> None:
     """Register IR controller device in device registry."""
-    device_registry = dr.async_get(hass)
-    
     device_registry.async_get_or_create(
         config_entry_id=entry.entry_id,
         identifiers={(DOMAIN, entry.entry_id)},
@@ -659,31 +594,32 @@ async def _migrate_universal_to_light(hass: HomeAssistant, controller_id: str, s
         _LOGGER.debug("Migration: no devices needed migration")
 
 
-async def _create_virtual_devices(hass: HomeAssistant, entry: ConfigEntry, storage: IRRemoteStorage) -> None:
+@callback
+def _create_virtual_devices(device_registry: dr.DeviceRegistry, entry: ConfigEntry, storage: IRRemoteStorage) -> None:
     """Create virtual devices in device registry."""
-    device_registry = dr.async_get(hass)
     controller_id = entry.entry_id
     
+    via_device = (DOMAIN, controller_id)
+    
     # Get devices from storage
     devices = storage.get_devices(controller_id)
     
     for device in devices:
-        device_id = device["id"]
-        device_name = device["name"]
-        
         # Create virtual device
         device_registry.async_get_or_create(
             config_entry_id=entry.entry_id,
-            identifiers={(DOMAIN, f"{controller_id}_{device_id}")},
-            name=device_name,
+            identifiers={(DOMAIN, f"{controller_id}_{device['id']}")},
+            name=device["name"],
             manufacturer=MANUFACTURER,
             model=MODEL_VIRTUAL_DEVICE,
-            via_device=(DOMAIN, controller_id),
+            via_device=via_device,
         )
-        
-        _LOGGER.debug("Created virtual device: %s", device_name)
+    
+    _LOGGER.debug("Created %d virtual devices for controller %s", len(devices), controller_id)
+
 
-async def _cleanup_command_entity(hass: HomeAssistant, controller_id: str, device_id: str, command_id: str) -> None:
+@callback
+def _cleanup_command_entity(hass: HomeAssistant, controller_id: str, device_id: str, command_id: str) -> None:
     """Remove command button entity from Entity Registry."""
     entity_registry = er.async_get(hass)
 
@@ -699,7 +635,8 @@ async def _cleanup_command_entity(hass: HomeAssistant, controller_id: str, devic
         _LOGGER.debug("Command entity not found for cleanup: %s", unique_id)
 
 
-async def _cleanup_device_entities(hass: HomeAssistant, controller_id: str, device_id: str, commands: list) -> None:
+@callback
+def _cleanup_device_entities(hass: HomeAssistant, controller_id: str, device_id: str, commands: list) -> None:
     """Remove all button entities for a device from Entity Registry."""
     entity_registry = er.async_get(hass)
 
@@ -735,7 +672,8 @@ async def _cleanup_device_entities(hass: HomeAssistant, controller_id: str, devi
         _LOGGER.debug("Removed climate entity: %s", climate_entity_id)
 
 
-async def _cleanup_virtual_device(hass: HomeAssistant, controller_id: str, device_id: str) -> None:
+@callback
+def _cleanup_virtual_device(hass: HomeAssistant, controller_id: str, device_id: str) -> None:
     """Remove virtual device from Device Registry."""
     device_registry = dr.async_get(hass)
 
@@ -752,20 +690,16 @@ async def _cleanup_virtual_device(hass: HomeAssistant, controller_id: str, devic
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    _LOGGER.info("Unloading IR Remote entry: %s", entry.title)
+    _LOGGER.debug("Unloading IR Remote entry: %s", entry.title)
     
     # Unload platforms
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        # Remove ZHA event listener
-        entry_data = hass.data[DOMAIN].get(entry.entry_id)
-        if entry_data and "zha_listener" in entry_data:
-            entry_data["zha_listener"]()
-            _LOGGER.debug("Removed ZHA event listener for %s", entry.entry_id)
-        
-        # Remove entry data
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        # Remove entry data and drop a pending delayed reload
+        entry_data = hass.data[DOMAIN][DATA_ENTRIES].pop(entry.entry_id, None)
+        if entry_data and entry_data.get("reload_handle") is not None:
+            entry_data["reload_handle"].cancel()
         
         # Подсчитываем оставшиеся активные контроллеры
         active_controllers_count = _count_active_controllers(hass)
@@ -773,22 +707,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         
         # Remove services if no more active controllers
         if active_controllers_count == 0:
-            _LOGGER.info("Removing IR Remote services (no active controllers)")
-            services = [
-                SERVICE_LEARN_COMMAND, SERVICE_SEND_CODE, SERVICE_SEND_COMMAND,
-                SERVICE_ADD_DEVICE, SERVICE_ADD_COMMAND, SERVICE_REMOVE_DEVICE,
-                SERVICE_REMOVE_COMMAND, SERVICE_GET_DATA
-            ]
-            for service in services:
+            _LOGGER.debug("Removing IR Remote services (no active controllers)")
+            for service in SERVICES:
                 if hass.services.has_service(DOMAIN, service):
                     hass.services.async_remove(DOMAIN, service)
                     _LOGGER.debug("Removed service: %s", service)
                 else:
                     _LOGGER.debug("Service %s was not registered", service)
             
-            _LOGGER.info("All IR Remote services removed")
+            _LOGGER.debug("All IR Remote services removed")
         else:
             _LOGGER.debug("Services kept (still have %d active controllers)", active_controllers_count)
     
-    _LOGGER.info("IR Remote entry unloaded: %s", unload_ok)
+    _LOGGER.debug("IR Remote entry unloaded: %s", unload_ok)
     return unload_ok
\ No newline at end of file
@@ -1,21 +1,22 @@
 """Button platform for IR Remote integration."""
 import logging
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 
 from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .helpers import async_fire_zha_code
 from .const import (
     DOMAIN,
-    ATTR_CONTROLLER_ID,
-    ATTR_CODE,
-    SERVICE_SEND_CODE,
+    DATA_ENTRIES,
     MANUFACTURER,
     MODEL_VIRTUAL_DEVICE,
     TRANSLATION_KEY_DEVICE_COMMAND,
+    SIGNAL_COMMAND_ADDED,
 )
 from .data import IRRemoteStorage
 
@@ -28,10 +29,10 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up IR Remote button entities."""
-    _LOGGER.info("Setting up IR Remote buttons for: %s", config_entry.title)
+    _LOGGER.debug("Setting up IR Remote buttons for: %s", config_entry.title)
     
     # Get storage for this controller
-    entry_data = hass.data[DOMAIN].get(config_entry.entry_id)
+    entry_data = hass.data[DOMAIN][DATA_ENTRIES].get(config_entry.entry_id)
     if not entry_data:
         _LOGGER.error("No entry data found for %s", config_entry.entry_id)
         return
@@ -46,20 +47,21 @@ async def async_setup_entry(
         return
     
     buttons: List[ButtonEntity] = []
+    # (device_id, command_id) -> button, to update or extend without a reload
+    buttons_by_command: Dict[Tuple[str, str], IRRemoteCommandButton] = {}
     
-    # Get all devices for this controller
-    devices = storage.get_devices(controller_id)
+    # Get all devices with their commands for this controller in one pass
+    devices = storage.get_devices_with_commands(controller_id)
     _LOGGER.debug("Found %d devices for controller %s", len(devices), controller_id)
-    
+
     for device in devices:
         device_id = device["id"]
         device_name = device["name"]
         device_type = device.get("type", "universal")  # Добавлено получение типа
-        
-        _LOGGER.info("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
-        
-        # Get all commands for this device
-        commands = storage.get_commands(controller_id, device_id)
+
+        _LOGGER.debug("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
+
+        commands = device["commands"]
         _LOGGER.debug("Found %d commands for device %s", len(commands), device_name)
         
         for command in commands:
@@ -77,14 +79,51 @@ async def async_setup_entry(
                 command_id=command_id,
                 command_name=command_name,
                 command_code=command_code,
+                entry_data=entry_data,
             )
             buttons.append(command_button)
+            buttons_by_command[(device_id, command_id)] = command_button
             _LOGGER.debug("Created command button: %s - %s", device_name, command_name)
     
-    _LOGGER.info("Created %d buttons for controller %s", len(buttons), controller_id)
+    _LOGGER.debug("Created %d buttons for controller %s", len(buttons), controller_id)
     
     # Add all buttons
     async_add_entities(buttons)
+    
+    @callback
+    def _async_command_added(device_id: str, command_id: str) -> None:
+        """Add or update the button for a newly stored command."""
+        device = storage.get_device(controller_id, device_id)
+        command = device["commands"].get(command_id) if device else None
+        if not command:
+            return
+        
+        existing = buttons_by_command.get((device_id, command_id))
+        if existing:
+            # Command was re-learned - just pick up the new code
+            existing.update_code(command.get("code", ""))
+            return
+        
+        command_button = IRRemoteCommandButton(
+            hass=hass,
+            config_entry=config_entry,
+            controller_id=controller_id,
+            device_id=device_id,
+            device_name=device["name"],
+            command_id=command_id,
+            command_name=command.get("name", command_id),
+            command_code=command.get("code", ""),
+            entry_data=entry_data,
+        )
+        buttons_by_command[(device_id, command_id)] = command_button
+        async_add_entities([command_button])
+        _LOGGER.debug("Added command button: %s - %s", device["name"], command_id)
+    
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_COMMAND_ADDED.format(controller_id), _async_command_added
+        )
+    )
 
 
 class IRRemoteCommandButton(ButtonEntity):
@@ -100,6 +139,7 @@ class IRRemoteCommandButton(ButtonEntity):
         command_id: str,
         command_name: str,
         command_code: str,
+        entry_data: Dict[str, Any],
     ) -> None:
         """Initialize the command button."""
         self.hass = hass
@@ -110,12 +150,16 @@ class IRRemoteCommandButton(ButtonEntity):
         self._command_id = command_id
         self._command_name = command_name
         self._command_code = command_code
+        # Per-entry ZHA send state, lives as long as the entity
+        self._entry_data = entry_data
         
         # Entity attributes
         self._attr_unique_id = f"{DOMAIN}_{controller_id}_{device_id}_{command_id}"
         self._attr_name = command_name
         self._attr_translation_key = TRANSLATION_KEY_DEVICE_COMMAND
         self._attr_should_poll = False
+        # Icon depends only on the command name - resolve it once
+        self._attr_icon = self._icon_for_command(command_name)
         
         # Device info - link to virtual device
         self._attr_device_info = DeviceInfo(
@@ -133,11 +177,15 @@ class IRRemoteCommandButton(ButtonEntity):
         """Return if entity is available."""
         return True
     
-    @property
-    def icon(self) -> str:
-        """Return the icon for the button."""
+    def update_code(self, command_code: str) -> None:
+        """Replace the IR code sent by this button."""
+        self._command_code = command_code
+    
+    @staticmethod
+    def _icon_for_command(command_name: str) -> str:
+        """Return the icon for a command name."""
         # You can customize icons based on command name
-        command_lower = self._command_name.lower()
+        command_lower = command_name.lower()
         
         if "power" in command_lower or "on" in command_lower or "off" in command_lower:
             return "mdi:power"
@@ -163,64 +211,14 @@ class IRRemoteCommandButton(ButtonEntity):
     
     async def async_press(self) -> None:
         """Handle button press."""
-        _LOGGER.info("Pressed button: %s - %s", self._device_name, self._command_name)
+        _LOGGER.debug("Pressed button: %s - %s", self._device_name, self._command_name)
         
         try:
-            # Send IR code through service
-            await self.hass.services.async_call(
-                DOMAIN,
-                SERVICE_SEND_CODE,
-                {
-                    ATTR_CONTROLLER_ID: self._controller_id,
-                    ATTR_CODE: self._command_code,
-                },
-                blocking=True
-            )
+            # Send IR code directly via ZHA, without a send_code service round-trip
+            await async_fire_zha_code(self.hass, self._entry_data, self._command_code)
             _LOGGER.debug("Successfully sent IR code for %s - %s", 
                          self._device_name, self._command_name)
             
         except Exception as e:
             _LOGGER.error("Failed to send IR code for %s - %s: %s", 
                          self._device_name, self._command_name, e)
-
-
-    async def _send_code(self) -> None:
-        """Send IR code directly via ZHA."""
-        try:
-            # Get controller data from integration
-            entry_data = self.hass.data.get("ir_remote", {}).get(self._controller_id)
-            if not entry_data:
-                _LOGGER.error("Controller data not found for %s", self._controller_id)
-                return
-            
-            storage = entry_data["storage"]
-            controller = storage.get_controller(self._controller_id)
-            
-            if not controller:
-                _LOGGER.error("Controller not found in storage: %s", self._controller_id)
-                return
-            
-            # Send ZHA command directly (like in your script)
-            await self.hass.services.async_call(
-                "zha",
-                "issue_zigbee_cluster_command",
-                {
-                    "ieee": controller["ieee"],
-                    "endpoint_id": controller["endpoint_id"],
-                    "cluster_id": controller["cluster_id"],
-                    "cluster_type": "in",
-                    "command": 2,  # Command for sending (as in your script)
-                    "command_type": "server",
-                    "params": {
-                        "code": self._command_code
-                    }
-                },
-                blocking=True
-            )
-            _LOGGER.info("Successfully sent IR code directly via ZHA for %s - %s", 
-                        self._device_name, self._command_name)
-            
-        except Exception as e:
-            _LOGGER.error("Failed to send IR code directly: %s", e)
-
-
@@ -1,6 +1,6 @@
 """Climate platform for IR Remote integration."""
 import logging
-from typing import Any, List, Optional
+from typing import Any, Dict, Optional
 
 from homeassistant.components.climate import (
     ClimateEntity,
@@ -9,28 +9,46 @@ from homeassistant.components.climate import (
     HVACAction,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.const import UnitOfTemperature
 
+from .helpers import async_fire_zha_code
 from .const import (
     DOMAIN,
-    ATTR_CONTROLLER_ID,
-    ATTR_DEVICE,
-    ATTR_COMMAND,
-    SERVICE_SEND_COMMAND,
+    DATA_ENTRIES,
     MANUFACTURER,
     MODEL_CLIMATE,
     TRANSLATION_KEY_CLIMATE,
     DEVICE_TYPE_AC,
     POWER_ON_COMMANDS,
     POWER_OFF_COMMANDS,
+    SIGNAL_COMMAND_ADDED,
+    SIGNAL_DEVICE_ADDED,
 )
 from .data import IRRemoteStorage
 
 _LOGGER = logging.getLogger(__name__)
 
+# Same for every IR air conditioner - shared between entities
+HVAC_MODES = [
+    HVACMode.OFF,
+    HVACMode.COOL,
+    HVACMode.HEAT,
+    HVACMode.AUTO,
+    HVACMode.FAN_ONLY,
+    HVACMode.DRY,
+]
+FAN_MODES = ["auto", "low", "medium", "high"]
+SUPPORTED_FEATURES = (
+    ClimateEntityFeature.TARGET_TEMPERATURE |
+    ClimateEntityFeature.FAN_MODE |
+    ClimateEntityFeature.TURN_ON |
+    ClimateEntityFeature.TURN_OFF
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -38,10 +56,10 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up IR Remote climate entities."""
-    _LOGGER.info("Setting up IR Remote climate entities for: %s", config_entry.title)
+    _LOGGER.debug("Setting up IR Remote climate entities for: %s", config_entry.title)
     
     # Get storage for this controller
-    entry_data = hass.data[DOMAIN].get(config_entry.entry_id)
+    entry_data = hass.data[DOMAIN][DATA_ENTRIES].get(config_entry.entry_id)
     if not entry_data:
         _LOGGER.error("No entry data found for %s", config_entry.entry_id)
         return
@@ -66,7 +84,7 @@ async def async_setup_entry(
         device_name = device["name"]
         device_type = device.get("type", "universal")
         
-        _LOGGER.info("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
+        _LOGGER.debug("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
         
         # Only create climate entity for AC devices
         if device_type == DEVICE_TYPE_AC:
@@ -80,15 +98,42 @@ async def async_setup_entry(
                 device_id=device_id,
                 device_name=device_name,
                 storage=storage,
+                entry_data=entry_data,
             )
             climate_entities.append(climate_entity)
             _LOGGER.debug("Created climate entity for device %s", device_name)
     
-    _LOGGER.info("Created %d climate entities for controller %s", len(climate_entities), controller_id)
+    _LOGGER.debug("Created %d climate entities for controller %s", len(climate_entities), controller_id)
     
     # Add all climate entities
     async_add_entities(climate_entities)
 
+    @callback
+    def _async_device_added(device_id: str) -> None:
+        """Create the climate entity for a newly added device."""
+        device = storage.get_device(controller_id, device_id)
+        if not device or device["type"] != DEVICE_TYPE_AC:
+            return
+        
+        async_add_entities([
+            IRClimate(
+                hass=hass,
+                config_entry=config_entry,
+                controller_id=controller_id,
+                device_id=device_id,
+                device_name=device["name"],
+                storage=storage,
+                entry_data=entry_data,
+            )
+        ])
+        _LOGGER.debug("Added climate entity for device %s", device["name"])
+    
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_DEVICE_ADDED.format(controller_id), _async_device_added
+        )
+    )
+
 
 class IRClimate(ClimateEntity):
     """Climate entity for IR air conditioners."""
@@ -101,6 +146,7 @@ class IRClimate(ClimateEntity):
         device_id: str,
         device_name: str,
         storage: IRRemoteStorage,
+        entry_data: Dict[str, Any],
     ) -> None:
         """Initialize the climate entity."""
         self.hass = hass
@@ -109,12 +155,20 @@ class IRClimate(ClimateEntity):
         self._device_id = device_id
         self._device_name = device_name
         self._storage = storage
+        # Per-entry ZHA send state, lives as long as the entity
+        self._entry_data = entry_data
         
         # Entity attributes
         self._attr_unique_id = f"{DOMAIN}_{controller_id}_{device_id}_climate"
         self._attr_name = device_name
         self._attr_translation_key = TRANSLATION_KEY_CLIMATE
         self._attr_should_poll = False
+        self._attr_extra_state_attributes = {
+            "device_id": device_id,
+            "controller_id": controller_id,
+            "device_type": "ac",
+        }
+        self._attr_icon = "mdi:air-conditioner"
         
         # Device info - link to the same virtual device as buttons
         self._attr_device_info = DeviceInfo(
@@ -136,38 +190,43 @@ class IRClimate(ClimateEntity):
         self._current_hvac_action = HVACAction.OFF
         self._fan_mode = "auto"
         
-        # Available modes and features
-        self._attr_hvac_modes = [
-            HVACMode.OFF,
-            HVACMode.COOL,
-            HVACMode.HEAT,
-            HVACMode.AUTO,
-            HVACMode.FAN_ONLY,
-            HVACMode.DRY,
-        ]
-        
-        self._attr_fan_modes = ["auto", "low", "medium", "high"]
+        # Available modes and features (shared, never mutated in place)
+        self._attr_hvac_modes = HVAC_MODES
+        self._attr_fan_modes = FAN_MODES
         
         # Analyze available commands and set temperature range
-        _LOGGER.info("Initializing climate entity: controller_id=%s, device_id=%s, device_name=%s", 
+        _LOGGER.debug("Initializing climate entity: controller_id=%s, device_id=%s, device_name=%s", 
                     controller_id, device_id, device_name)
         self._update_temperature_range()
         
         # Set supported features
-        self._attr_supported_features = (
-            ClimateEntityFeature.TARGET_TEMPERATURE |
-            ClimateEntityFeature.FAN_MODE |
-            ClimateEntityFeature.TURN_ON |
-            ClimateEntityFeature.TURN_OFF
-        )
+        self._attr_supported_features = SUPPORTED_FEATURES
         
         _LOGGER.debug("Initialized climate entity: %s (temp range: %s-%s)", 
                      device_name, self._attr_min_temp, self._attr_max_temp)
     
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to command additions for this device."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_COMMAND_ADDED.format(self._controller_id),
+                self._async_command_added,
+            )
+        )
+    
+    @callback
+    def _async_command_added(self, device_id: str, command_id: str) -> None:
+        """Refresh derived state when a command is added to this device."""
+        if device_id != self._device_id:
+            return
+        
+        self._update_temperature_range()
+        self.async_write_ha_state()
+    
     def _find_command(self, command_names: list) -> Optional[str]:
         """Find command from available commands."""
-        commands = self._storage.get_commands(self._controller_id, self._device_id)
-        available_commands = {cmd["id"].lower(): cmd["id"] for cmd in commands}
+        available_commands = self._storage.get_command_lookup(self._controller_id, self._device_id)
         
         for cmd_name in command_names:
             if cmd_name.lower() in available_commands:
@@ -205,14 +264,9 @@ class IRClimate(ClimateEntity):
         """Return if entity is available."""
         return True
     
-    @property
-    def icon(self) -> str:
-        """Return the icon for the climate entity."""
-        return "mdi:air-conditioner"
-    
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new target hvac mode."""
-        _LOGGER.info("Setting HVAC mode to %s for %s", hvac_mode, self._device_name)
+        _LOGGER.debug("Setting HVAC mode to %s for %s", hvac_mode, self._device_name)
         
         if hvac_mode == HVACMode.OFF:
             await self.async_turn_off()
@@ -248,7 +302,7 @@ class IRClimate(ClimateEntity):
                 self._current_hvac_action = HVACAction.IDLE
             
             self.async_write_ha_state()
-            _LOGGER.info("Set HVAC mode to %s with command %s", hvac_mode, command)
+            _LOGGER.debug("Set HVAC mode to %s with command %s", hvac_mode, command)
         else:
             _LOGGER.warning("No command found for HVAC mode %s", hvac_mode)
     
@@ -269,43 +323,26 @@ class IRClimate(ClimateEntity):
             
             # Pattern 1: temp_XX or temperature_XX
             if command_id.startswith("temp_") or command_id.startswith("temperature_"):
-                try:
-                    temp_value = int(command_id.split("_")[1])
-                except (ValueError, IndexError):
+                temp_str = command_id.split("_")[1]
+                if not temp_str.isdigit():
                     continue
+                temp_value = int(temp_str)
             
             # Pattern 2: tempXX or temperatureXX
             elif command_id.startswith("temp") and command_id[4:].isdigit():
-                try:
-                    temp_value = int(command_id[4:])
-                except ValueError:
-                    continue
+                temp_value = int(command_id[4:])
             elif command_id.startswith("temperature") and command_id[11:].isdigit():
-                try:
-                    temp_value = int(command_id[11:])
-                except ValueError:
-                    continue
+                temp_value = int(command_id[11:])
             
             # Pattern 3: XXc or XX°c (like 24c, 24°c)
             elif command_id.endswith("c") or command_id.endswith("°c"):
-                try:
-                    temp_str = command_id.replace("°c", "").replace("c", "")
-                    if temp_str.isdigit():
-                        temp_value = int(temp_str)
-                except ValueError:
-                    continue
+                temp_str = command_id.replace("°c", "").replace("c", "")
+                if temp_str.isdigit():
+                    temp_value = int(temp_str)
             
             # Pattern 4: Pure numbers that might be temperature
             elif command_id.isdigit():
-                try:
-                    temp_value = int(command_id)
-                    # Only consider reasonable temperature values
-                    if 10 <= temp_value <= 40:
-                        pass  # Keep this temperature
-                    else:
-                        temp_value = None
-                except ValueError:
-                    continue
+                temp_value = int(command_id)
             
             if temp_value is not None and 10 <= temp_value <= 40:
                 temp_commands.append(temp_value)
@@ -315,22 +352,23 @@ class IRClimate(ClimateEntity):
             # Set range based on available commands
             self._attr_min_temp = min(temp_commands)
             self._attr_max_temp = max(temp_commands)
-            _LOGGER.info("Found temperature commands for %s: %s°C to %s°C (commands: %s)", 
+            _LOGGER.debug("Found temperature commands for %s: %s°C to %s°C (commands: %s)", 
                         self._device_name, self._attr_min_temp, self._attr_max_temp, sorted(temp_commands))
         else:
             # Default range if no temp commands found
             self._attr_min_temp = 16
             self._attr_max_temp = 30
-            _LOGGER.info("No temperature commands found for %s, using default range: %s-%s°C", 
+            _LOGGER.debug("No temperature commands found for %s, using default range: %s-%s°C", 
                         self._device_name, self._attr_min_temp, self._attr_max_temp)
     
     def _find_temperature_command(self, temperature: int) -> Optional[str]:
         """Find exact temperature command with flexible matching."""
         commands = self._storage.get_commands(self._controller_id, self._device_id)
         
-        _LOGGER.debug("Looking for temperature %s°C. Available commands:", temperature)
-        for command in commands:
-            _LOGGER.debug("  - %s (%s)", command["id"], command["name"])
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Looking for temperature %s°C. Available commands:", temperature)
+            for command in commands:
+                _LOGGER.debug("  - %s (%s)", command["id"], command["name"])
         
         # Try different naming patterns for temperature commands
         possible_names = [
@@ -351,12 +389,12 @@ class IRClimate(ClimateEntity):
             # Check exact matches
             for possible_name in possible_names:
                 if command_id_lower == possible_name.lower():
-                    _LOGGER.info("Found temperature command: %s for %s°C", command["id"], temperature)
+                    _LOGGER.debug("Found temperature command: %s for %s°C", command["id"], temperature)
                     return command["id"]
             
             # Check if command contains temperature value
             if str(temperature) in command_id_lower and any(keyword in command_id_lower for keyword in ["temp", "temperature"]):
-                _LOGGER.info("Found temperature command by pattern: %s for %s°C", command["id"], temperature)
+                _LOGGER.debug("Found temperature command by pattern: %s for %s°C", command["id"], temperature)
                 return command["id"]
         
         _LOGGER.warning("No command found for temperature %s°C. Searched patterns: %s", temperature, possible_names)
@@ -372,23 +410,20 @@ class IRClimate(ClimateEntity):
         # Round to nearest integer
         temperature = round(temperature)
         
-        _LOGGER.info("Setting temperature to %s°C for %s", temperature, self._device_name)
-        _LOGGER.info("Climate entity info: controller_id=%s, device_id=%s", self._controller_id, self._device_id)
+        _LOGGER.debug("Setting temperature to %s°C for %s", temperature, self._device_name)
+        _LOGGER.debug("Climate entity info: controller_id=%s, device_id=%s", self._controller_id, self._device_id)
         
         # DEBUG: Check if storage is accessible
         if not self._storage:
             _LOGGER.error("Storage is None!")
             return
         
-        # DEBUG: Get all commands and show them
-        try:
+        # DEBUG: Get all commands and show them (only when debug logging is on)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
             commands = self._storage.get_commands(self._controller_id, self._device_id)
-            _LOGGER.info("Retrieved %d commands from storage:", len(commands))
+            _LOGGER.debug("Retrieved %d commands from storage:", len(commands))
             for i, cmd in enumerate(commands):
-                _LOGGER.info("  Command %d: id='%s', name='%s'", i+1, cmd.get("id", "NO_ID"), cmd.get("name", "NO_NAME"))
-        except Exception as e:
-            _LOGGER.error("Failed to get commands from storage: %s", e)
-            return
+                _LOGGER.debug("  Command %d: id='%s', name='%s'", i+1, cmd.get("id", "NO_ID"), cmd.get("name", "NO_NAME"))
         
         # Check if temperature is in allowed range
         if temperature < self._attr_min_temp or temperature > self._attr_max_temp:
@@ -397,16 +432,16 @@ class IRClimate(ClimateEntity):
             return
         
         # Find exact temperature command
-        _LOGGER.info("Looking for temperature command for %s°C...", temperature)
+        _LOGGER.debug("Looking for temperature command for %s°C...", temperature)
         temp_command = self._find_temperature_command(temperature)
         
         if temp_command:
             try:
-                _LOGGER.info("Found temperature command: %s, sending...", temp_command)
+                _LOGGER.debug("Found temperature command: %s, sending...", temp_command)
                 await self._send_command(temp_command)
                 self._target_temperature = temperature
                 self.async_write_ha_state()
-                _LOGGER.info("Successfully set target temperature to %s°C with command %s", temperature, temp_command)
+                _LOGGER.debug("Successfully set target temperature to %s°C with command %s", temperature, temp_command)
             except Exception as e:
                 _LOGGER.error("Failed to send temperature command %s: %s", temp_command, e)
         else:
@@ -415,7 +450,7 @@ class IRClimate(ClimateEntity):
     
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """Set new target fan mode."""
-        _LOGGER.info("Setting fan mode to %s for %s", fan_mode, self._device_name)
+        _LOGGER.debug("Setting fan mode to %s for %s", fan_mode, self._device_name)
         
         command = self._find_command([f"fan_{fan_mode}", f"fan_speed_{fan_mode}", "fan_speed"])
         
@@ -423,13 +458,13 @@ class IRClimate(ClimateEntity):
             await self._send_command(command)
             self._fan_mode = fan_mode
             self.async_write_ha_state()
-            _LOGGER.info("Set fan mode to %s with command %s", fan_mode, command)
+            _LOGGER.debug("Set fan mode to %s with command %s", fan_mode, command)
         else:
             _LOGGER.warning("No command found for fan mode %s", fan_mode)
     
     async def async_turn_on(self) -> None:
         """Turn the climate entity on."""
-        _LOGGER.info("Turning on climate: %s", self._device_name)
+        _LOGGER.debug("Turning on climate: %s", self._device_name)
         
         power_command = self._find_command(POWER_ON_COMMANDS)
         if not power_command:
@@ -441,13 +476,13 @@ class IRClimate(ClimateEntity):
                 self._hvac_mode = HVACMode.AUTO
             self._current_hvac_action = HVACAction.IDLE
             self.async_write_ha_state()
-            _LOGGER.info("Turned on climate with command %s", power_command)
+            _LOGGER.debug("Turned on climate with command %s", power_command)
         else:
             _LOGGER.warning("No power on command found for %s", self._device_name)
     
     async def async_turn_off(self) -> None:
         """Turn the climate entity off."""
-        _LOGGER.info("Turning off climate: %s", self._device_name)
+        _LOGGER.debug("Turning off climate: %s", self._device_name)
         
         power_command = self._find_command(POWER_OFF_COMMANDS)
         if not power_command:
@@ -458,7 +493,7 @@ class IRClimate(ClimateEntity):
             self._hvac_mode = HVACMode.OFF
             self._current_hvac_action = HVACAction.OFF
             self.async_write_ha_state()
-            _LOGGER.info("Turned off climate with command %s", power_command)
+            _LOGGER.debug("Turned off climate with command %s", power_command)
         else:
             _LOGGER.warning("No power off command found for %s", self._device_name)
     
@@ -466,27 +501,15 @@ class IRClimate(ClimateEntity):
         """Send IR command."""
         _LOGGER.debug("Sending command '%s' to device %s", command, self._device_name)
         
+        code = self._storage.get_command_code(self._controller_id, self._device_id, command)
+        if not code:
+            _LOGGER.error("Command code not found: %s - %s", self._device_id, command)
+            return
+        
         try:
-            await self.hass.services.async_call(
-                DOMAIN,
-                SERVICE_SEND_COMMAND,
-                {
-                    ATTR_CONTROLLER_ID: self._controller_id,
-                    ATTR_DEVICE: self._device_id,
-                    ATTR_COMMAND: command,
-                },
-                blocking=True
-            )
+            # Send directly via ZHA, without a send_command service round-trip
+            await async_fire_zha_code(self.hass, self._entry_data, code)
             _LOGGER.debug("Successfully sent command %s", command)
             
         except Exception as e:
             _LOGGER.error("Failed to send command %s: %s", command, e)
-    
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
-        """Return extra state attributes."""
-        return {
-            "device_id": self._device_id,
-            "controller_id": self._controller_id,
-            "device_type": "ac",
-        }
\ No newline at end of file
@@ -1,7 +1,6 @@
 """Config flow for IR Remote integration."""
 from __future__ import annotations
 
-import asyncio
 import logging
 from typing import Any, Dict
 
@@ -11,41 +10,27 @@ from homeassistant import config_entries
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 import homeassistant.helpers.config_validation as cv
-from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import entity_registry as er, device_registry as dr 
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 
 from .const import (
     DOMAIN,
+    DATA_ENTRIES,
     CONF_IEEE,
     CONF_ENDPOINT,
     CONF_CLUSTER,
     CONF_ROOM_NAME,
     CONF_ACTION,
-    CONF_CONTROLLER_ID,
     CONF_DEVICE_NAME,
     CONF_DEVICE_TYPE,  
-    CONF_COMMAND_NAME,
     ACTION_ADD_CONTROLLER,
-    ACTION_ADD_DEVICE,
-    ACTION_ADD_COMMAND,
     ACTION_COPY,
-    ACTION_REMOVE_DEVICE,
-    ACTION_REMOVE_COMMAND,
-    STEP_SELECT_CONTROLLER_FOR_REMOVE_DEVICE, 
-    STEP_SELECT_DEVICE_FOR_REMOVE,
-    STEP_CONFIRM_REMOVE_DEVICE,
-    STEP_SELECT_CONTROLLER_FOR_REMOVE_COMMAND,
-    STEP_SELECT_DEVICE_FOR_REMOVE_COMMAND,
-    STEP_SELECT_COMMAND_FOR_REMOVE,
-    STEP_CONFIRM_REMOVE_COMMAND,
     ERROR_REMOVE_FAILED,
     STEP_INIT,
     STEP_ADD_CONTROLLER,
     STEP_ADD_DEVICE,
     STEP_SELECT_DEVICE_TYPE,  
-    STEP_ADD_COMMAND,
-    STEP_LEARN_COMMAND,
 
     STEP_COPY_SELECT_TYPE,
     STEP_COPY_SELECT_SOURCE_CONTROLLER,
@@ -72,16 +57,26 @@ from .const import (
     ERROR_COMMAND_EXISTS,
     ERROR_INVALID_NAME,
     ERROR_COPY_FAILED,
-    ERROR_NO_SOURCE_DATA,
-    ERROR_SAME_TARGET,
 
     DEFAULT_ENDPOINT_ID,
     DEFAULT_CLUSTER_ID,
+    ZHA_COMMAND_LEARN,
+    LEARN_TIMEOUT,
+    ERROR_LEARN_TIMEOUT,
+    ERROR_LEARN_FAILED,
+    SIGNAL_COMMAND_ADDED,
+    SIGNAL_DEVICE_ADDED,
     DEVICE_TYPES,
     DEVICE_TYPE_LIGHT,  # ИЗМЕНЕНО: вместо DEVICE_TYPE_UNIVERSAL
 )
 
-from .data import IRRemoteStorage
+from .data import IRRemoteStorage, async_get_storage, name_to_id
+from .helpers import (
+    async_read_previous_code,
+    async_schedule_entry_reload,
+    async_wait_for_learned_code,
+    build_zha_send_base,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -90,6 +85,11 @@ async def get_zha_devices(hass: HomeAssistant) -> Dict[str, str]:
     """Get ZHA devices that could be IR controllers."""
     _LOGGER.debug("Getting ZHA devices for IR controllers")
     
+    # zha_toolkit is optional - skip the call instead of failing inside it
+    if not hass.services.has_service("zha_toolkit", "zha_devices"):
+        _LOGGER.error("zha_toolkit is not installed, cannot list ZHA devices")
+        return {}
+    
     try:
         # Use zha_toolkit service to get devices
         result = await hass.services.async_call(
@@ -143,6 +143,7 @@ class IRRemoteConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self.flow_data: Dict[str, Any] = {}
         self.storage: IRRemoteStorage = None
+        self._zha_devices: Dict[str, str] | None = None
     
     async def async_step_user(self, user_input: Dict[str, Any] | None = None) -> FlowResult:
         """Handle the user step."""
@@ -186,9 +187,8 @@ class IRRemoteConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Get valid controllers and clean up orphaned ones."""
         # Initialize storage for checking existing controllers
         if self.storage is None:
-            self.storage = IRRemoteStorage(self.hass)
             try:
-                await self.storage.async_load()
+                self.storage = await async_get_storage(self.hass)
             except Exception as e:
                 _LOGGER.debug("Could not load storage in config flow: %s", e)
                 return []
@@ -251,8 +251,10 @@ class IRRemoteConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         }
                     )
         
-        # Get ZHA devices
-        zha_devices = await get_zha_devices(self.hass)
+        # Get ZHA devices (once per flow - the form is re-shown on validation errors)
+        if not self._zha_devices:
+            self._zha_devices = await get_zha_devices(self.hass)
+        zha_devices = self._zha_devices
         if not zha_devices:
             return self.async_abort(reason=ERROR_NO_ZHA)
         
@@ -506,9 +508,7 @@ class IRRemoteConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     if success:
                         config_entry = self.hass.config_entries.async_get_entry(target_controller_id)
                         if config_entry:
-                            self.hass.async_create_task(
-                                self.hass.config_entries.async_reload(target_controller_id)
-                            )
+                            async_schedule_entry_reload(self.hass, target_controller_id)
                         
                         return self.async_abort(
                             reason="device_copied",
@@ -533,9 +533,7 @@ class IRRemoteConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     if success:
                         config_entry = self.hass.config_entries.async_get_entry(target_controller_id)
                         if config_entry:
-                            self.hass.async_create_task(
-                                self.hass.config_entries.async_reload(target_controller_id)
-                            )
+                            async_schedule_entry_reload(self.hass, target_controller_id)
                         
                         command_count = len(source_commands) if source_commands else 0
                         return self.async_abort(
@@ -616,9 +614,8 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
         
         # Initialize storage
         if self.storage is None:
-            self.storage = IRRemoteStorage(self.hass)
             try:
-                await self.storage.async_load()
+                self.storage = await async_get_storage(self.hass)
             except Exception as e:
                 _LOGGER.debug("Could not load storage in options flow: %s", e)
                 return self.async_abort(reason="storage_error")
@@ -682,7 +679,7 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                 errors["device_name"] = ERROR_INVALID_NAME
             else:
                 # Generate device ID from name
-                device_id = device_name.lower().replace(" ", "_").replace("-", "_")
+                device_id = name_to_id(device_name)
                 
                 # Check if device already exists
                 try:
@@ -734,9 +731,9 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                 success = await self.storage.async_add_device(controller_id, device_id, device_name, device_type)
                 
                 if success:
-                    # Schedule reload after current flow completes
-                    self.hass.async_create_task(
-                        self._reload_entry_after_delay(controller_id)
+                    # Storage is shared with the entry - let its platforms create the entities
+                    async_dispatcher_send(
+                        self.hass, SIGNAL_DEVICE_ADDED.format(controller_id), device_id
                     )
                     
                     return self.async_abort(
@@ -810,7 +807,7 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                 errors["command_name"] = ERROR_INVALID_NAME
             else:
                 # Generate command ID from name
-                command_id = command_name.lower().replace(" ", "_").replace("-", "_")
+                command_id = name_to_id(command_name)
                 
                 # Check if command already exists
                 device_id = self.flow_data["device_id"]
@@ -845,12 +842,14 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_learn_command(self, user_input: Dict[str, Any] | None = None) -> FlowResult:
         """Handle IR learning process."""
         controller_id = self.config_entry.entry_id
+        errors = {}
         
         if user_input is not None:
             device_id = self.flow_data["device_id"]
             command_id = self.flow_data["command_id"]
             command_name = self.flow_data["command_name"]
             
+            started = True
             try:
                 # Check if service exists, if not - start learning directly
                 if self.hass.services.has_service("ir_remote", "learn_command"):
@@ -866,15 +865,18 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                     )
                 else:
                     # Start learning directly through the controller
-                    await self._start_learning_directly(controller_id, device_id, command_id, command_name)
+                    started = await self._start_learning_directly(controller_id, device_id, command_id, command_name)
                     
             except Exception as e:
                 _LOGGER.error("Failed to start learning: %s", e)
+                started = False
             
-            return self.async_create_entry(
-                title="",
-                data={}
-            )
+            if started:
+                return self.async_create_entry(
+                    title="",
+                    data={}
+                )
+            errors["base"] = ERROR_LEARN_FAILED
         
         controller = self.storage.get_controller(controller_id)
         device = self.storage.get_device(controller_id, self.flow_data["device_id"])
@@ -882,6 +884,7 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
         return self.async_show_form(
             step_id="learn_command",
             data_schema=vol.Schema({}),
+            errors=errors,
             description_placeholders={
                 "controller_name": controller["name"] if controller else "Неизвестный пульт",
                 "device_name": device["name"] if device else "Неизвестное устройство",
@@ -929,12 +932,10 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                 
                 if success:
                     # Clean up entities and device
-                    await self._cleanup_device_entities(controller_id, device_id, commands)
-                    await self._cleanup_virtual_device(controller_id, device_id)
+                    self._cleanup_device_entities(controller_id, device_id, commands)
+                    self._cleanup_virtual_device(controller_id, device_id)
                     # Reload integration to update entities  
-                    self.hass.async_create_task(
-                        self._reload_entry_after_delay(controller_id)
-                    )
+                    async_schedule_entry_reload(self.hass, controller_id)
 
                     return self.async_create_entry(
                         title="",
@@ -1039,11 +1040,9 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
                 
                 if success:
                     # Clean up entity
-                    await self._cleanup_command_entity(controller_id, device_id, command_id)
+                    self._cleanup_command_entity(controller_id, device_id, command_id)
                     # Reload integration to update entities
-                    self.hass.async_create_task(
-                        self._reload_entry_after_delay(controller_id)
-                    )
+                    async_schedule_entry_reload(self.hass, controller_id)
 
                     return self.async_create_entry(
                         title="",
@@ -1088,88 +1087,82 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
     
     # Helper methods
     
-    async def _reload_entry_after_delay(self, controller_id: str) -> None:
-        """Reload entry after a short delay."""
-        await asyncio.sleep(0.5)
-        await self.hass.config_entries.async_reload(controller_id)
-    
-    async def _start_learning_directly(self, controller_id: str, device_id: str, command_id: str, command_name: str) -> None:
-        """Start learning directly without using service."""
+    async def _start_learning_directly(self, controller_id: str, device_id: str, command_id: str, command_name: str) -> bool:
+        """Start learning directly without using service.
+        
+        Used when the services are not registered, i.e. the entry is not loaded -
+        the ZHA payload is then built from the stored controller. Returns False
+        if learning could not be started.
+        """
         try:
             _LOGGER.info("Starting learning process for %s - %s", device_id, command_name)
             
             controller = self.storage.get_controller(controller_id)
             if not controller:
                 _LOGGER.error("Controller not found: %s", controller_id)
-                return
+                return False
             
-            await self.hass.services.async_call(
-                "zha",
-                "issue_zigbee_cluster_command",
-                {
-                    "ieee": controller["ieee"],
-                    "endpoint_id": controller["endpoint_id"],
-                    "cluster_id": controller["cluster_id"],
-                    "cluster_type": "in",
-                    "command": 1,
-                    "command_type": "server",
-                    "params": {"on_off": True}
-                },
-                blocking=True
-            )
+            # Remember the previous code to detect when a new one is learned
+            previous_code = await async_read_previous_code(self.hass, controller)
+            
+            learn_params = {
+                **build_zha_send_base(controller),
+                "command": ZHA_COMMAND_LEARN,
+                "params": {"on_off": True}
+            }
             
-            # Schedule code reading after delay
+            entry_data = self.hass.data[DOMAIN][DATA_ENTRIES].get(controller_id)
+            if entry_data:
+                # Entry is loaded - share its ZHA concurrency limit
+                async with entry_data["zha_semaphore"]:
+                    await self.hass.services.async_call(
+                        "zha", "issue_zigbee_cluster_command", learn_params, blocking=True
+                    )
+            else:
+                await self.hass.services.async_call(
+                    "zha", "issue_zigbee_cluster_command", learn_params, blocking=True
+                )
+            
+            # Wait for the learned code in the background
             self.hass.async_create_task(
-                self._read_learned_code_after_delay(controller, controller_id, device_id, command_id, command_name)
+                self._read_learned_code_after_delay(
+                    controller, controller_id, device_id, command_id, command_name, previous_code
+                ),
+                eager_start=True,
             )
             
         except Exception as e:
             _LOGGER.error("Failed to start learning directly: %s", e)
-    
-    async def _read_learned_code_after_delay(self, controller: dict, controller_id: str, device_id: str, command_id: str, command_name: str) -> None:
-        """Read learned IR code after delay."""
-        await asyncio.sleep(10)
+            return False
         
+        return True
+    
+    async def _read_learned_code_after_delay(self, controller: dict, controller_id: str, device_id: str, command_id: str, command_name: str, previous_code: str | None) -> None:
+        """Read learned IR code once it appears."""
         try:
-            result = await self.hass.services.async_call(
-                "zha_toolkit",
-                "attr_read",
-                {
-                    "ieee": controller["ieee"],
-                    "endpoint": controller["endpoint_id"],
-                    "cluster": controller["cluster_id"],
-                    "attribute": 0,
-                    "use_cache": False
-                },
-                blocking=True,
-                return_response=True
-            )
-            
-            ir_code = None
-            if result and "result_read" in result:
-                result_read = result["result_read"]
-                if isinstance(result_read, (list, tuple)) and len(result_read) > 0:
-                    attributes_dict = result_read[0]
-                    if isinstance(attributes_dict, dict) and 0 in attributes_dict:
-                        ir_code = attributes_dict[0]
+            ir_code = await async_wait_for_learned_code(self.hass, controller, previous_code)
             
             if ir_code:
                 success = await self.storage.async_add_command(
-                    controller_id, device_id, command_id, command_name, str(ir_code)
+                    controller_id, device_id, command_id, command_name, ir_code
                 )
                 
                 if success:
                     _LOGGER.info("Successfully saved learned command: %s - %s", device_id, command_name)
-                    await self.hass.config_entries.async_reload(controller_id)
+                    # Storage is shared with the entry - let its platforms pick the command up
+                    async_dispatcher_send(
+                        self.hass, SIGNAL_COMMAND_ADDED.format(controller_id), device_id, command_id
+                    )
                 else:
                     _LOGGER.error("Failed to save learned command")
             else:
-                _LOGGER.error("No IR code found in response")
+                _LOGGER.error("No new IR code learned within %d s (%s)", LEARN_TIMEOUT, ERROR_LEARN_TIMEOUT)
                 
         except Exception as e:
             _LOGGER.error("Error reading learned code: %s", e)
     
-    async def _cleanup_command_entity(self, controller_id: str, device_id: str, command_id: str) -> None:
+    @callback
+    def _cleanup_command_entity(self, controller_id: str, device_id: str, command_id: str) -> None:
         """Remove command button entity from Entity Registry."""
         entity_registry = er.async_get(self.hass)
         unique_id = f"{DOMAIN}_{controller_id}_{device_id}_{command_id}"
@@ -1177,7 +1170,8 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
         if entity_id:
             entity_registry.async_remove(entity_id)
 
-    async def _cleanup_device_entities(self, controller_id: str, device_id: str, commands: list) -> None:
+    @callback
+    def _cleanup_device_entities(self, controller_id: str, device_id: str, commands: list) -> None:
         """Remove all button entities for a device from Entity Registry."""
         entity_registry = er.async_get(self.hass)
         
@@ -1188,7 +1182,8 @@ class IRRemoteOptionsFlowHandler(config_entries.OptionsFlow):
             if entity_id:
                 entity_registry.async_remove(entity_id)
 
-    async def _cleanup_virtual_device(self, controller_id: str, device_id: str) -> None:
+    @callback
+    def _cleanup_virtual_device(self, controller_id: str, device_id: str) -> None:
         """Remove virtual device from Device Registry."""
         device_registry = dr.async_get(self.hass)
         device_identifier = (DOMAIN, f"{controller_id}_{device_id}")
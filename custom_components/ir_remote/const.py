@@ -216,9 +216,28 @@ ATTR_COMMAND_NAME = "command_name"
 ZHA_COMMAND_LEARN = 1
 ZHA_COMMAND_SEND = 2
 
+# Максимум одновременных ZHA-команд на один контроллер
+ZHA_MAX_CONCURRENT_COMMANDS = 4
+
+# IR learning: attribute 0 is polled until a new code appears (seconds)
+LEARN_POLL_INTERVAL = 1
+LEARN_TIMEOUT = 10
+# Upper bound for reading the previous code before learning starts (seconds)
+LEARN_BASELINE_READ_TIMEOUT = 3
+
+# Delay before reloading an entry, so a burst of changes causes one reload (seconds)
+RELOAD_DELAY = 0.5
+
+# Dispatcher signals (format with controller entry_id)
+SIGNAL_COMMAND_ADDED = f"{DOMAIN}_command_added_{{}}"
+SIGNAL_DEVICE_ADDED = f"{DOMAIN}_device_added_{{}}"
+
 # Storage constants
 STORAGE_VERSION = 1
 STORAGE_KEY = "ir_remote_data"
+# hass.data[DOMAIN] keys: storage shared by all entries and flows, per-entry data by entry_id
+DATA_STORAGE = "_storage"
+DATA_ENTRIES = "entries"
 
 # Entity naming patterns
 ENTITY_COMMAND_BUTTON = "{device}_{command}"
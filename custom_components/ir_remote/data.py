@@ -7,10 +7,11 @@ from pathlib import Path
 
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.storage import Store
-from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.json import json_loads
 
 from .const import (
     DOMAIN,
+    DATA_STORAGE,
     STORAGE_VERSION,
     STORAGE_KEY,
     MAX_NAME_LENGTH,
@@ -19,6 +20,24 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
+# Пробелы и дефисы в ID заменяются на "_" одним проходом
+_ID_TRANSLATION = str.maketrans({" ": "_", "-": "_"})
+
+
+def name_to_id(name: str) -> str:
+    """Convert a device or command name to its storage ID."""
+    return name.lower().translate(_ID_TRANSLATION)
+
+
+async def async_get_storage(hass: HomeAssistant) -> "IRRemoteStorage":
+    """Return the storage shared by all config entries and flows, loading it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    storage = domain_data.get(DATA_STORAGE)
+    if storage is None:
+        storage = domain_data[DATA_STORAGE] = IRRemoteStorage(hass)
+    await storage.async_load()
+    return storage
+
 
 class IRRemoteStorage:
     """Class for managing IR Remote data through Storage API."""
@@ -29,10 +48,14 @@ class IRRemoteStorage:
         self.store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
         self._data: Dict[str, Any] = {}
         self._loaded = False
+        # (controller_id, device_id) -> {lowercase command ID: command ID}, dropped on save
+        self._command_lookups: Dict[tuple, Dict[str, str]] = {}
+        # Controller summaries for get_controllers(), dropped on save
+        self._controllers_summary: Optional[List[Dict[str, Any]]] = None
         
         # Old data file path for migration
-        self._old_data_file = (
-            Path(hass.config.path()) / "custom_components" / DOMAIN / "scripts" / "ir_codes.json"
+        self._old_data_file = Path(
+            hass.config.path("custom_components", DOMAIN, "scripts", "ir_codes.json")
         )
         
         _LOGGER.debug("IR Remote Storage initialized with key: %s", STORAGE_KEY)
@@ -43,38 +66,39 @@ class IRRemoteStorage:
             return self._data
         
         try:
-            _LOGGER.info("Storage: Starting data load...")
-            
-            # First attempt migration from old format
-            _LOGGER.info("Storage: Checking for migration...")
-            await self._migrate_old_data()
-            _LOGGER.info("Storage: Migration check completed")
+            _LOGGER.debug("Storage: Starting data load...")
             
             # Load from Storage API
-            _LOGGER.info("Storage: Loading from Store API...")
+            _LOGGER.debug("Storage: Loading from Store API...")
             stored_data = await self.store.async_load()
-            _LOGGER.info("Storage: Store API load completed, data exists: %s", stored_data is not None)
+            _LOGGER.debug("Storage: Store API load completed, data exists: %s", stored_data is not None)
             
             if stored_data is None:
-                _LOGGER.info("Storage: No existing IR data, initializing empty storage")
+                # Nothing stored yet - attempt migration from old format
+                _LOGGER.debug("Storage: Checking for migration...")
+                stored_data = await self._migrate_old_data()
+                _LOGGER.debug("Storage: Migration check completed")
+            
+            if stored_data is None:
+                _LOGGER.debug("Storage: No existing IR data, initializing empty storage")
                 self._data = {"controllers": {}}
-                _LOGGER.info("Storage: About to save initial empty data...")
+                _LOGGER.debug("Storage: About to save initial empty data...")
                 
                 # Try to save, but don't fail if it doesn't work
                 save_success = await self.async_save()
                 if save_success:
-                    _LOGGER.info("Storage: Initial save completed")
+                    _LOGGER.debug("Storage: Initial save completed")
                 else:
                     _LOGGER.warning("Storage: Initial save failed, continuing with memory-only storage")
             else:
                 self._data = stored_data
-                _LOGGER.info("Storage: IR data loaded: %d controllers", len(self._data.get("controllers", {})))
+                _LOGGER.debug("Storage: IR data loaded: %d controllers", len(self._data.get("controllers", {})))
             
             self._loaded = True
-            _LOGGER.info("Storage: Load process completed successfully")
+            _LOGGER.debug("Storage: Load process completed successfully")
             
         except Exception as e:
-            _LOGGER.error("Storage: Error loading IR data: %s", e, exc_info=True)
+            _LOGGER.exception("Storage: Error loading IR data: %s", e)
             self._data = {"controllers": {}}
             self._loaded = True
         
@@ -82,50 +106,46 @@ class IRRemoteStorage:
     
     async def async_save(self) -> bool:
         """Save data to Storage API."""
+        # Data was modified - cached lookups are stale
+        self._command_lookups.clear()
+        self._controllers_summary = None
+        
         try:
-            _LOGGER.info("Storage: Starting save operation...")
+            _LOGGER.debug("Storage: Starting save operation...")
             
             # Add timeout to prevent infinite hanging
-            import asyncio
             await asyncio.wait_for(
                 self.store.async_save(self._data), 
                 timeout=30.0  # 30 seconds timeout
             )
             
-            _LOGGER.info("Storage: Save operation completed successfully")
+            _LOGGER.debug("Storage: Save operation completed successfully")
             return True
         except asyncio.TimeoutError:
             _LOGGER.error("Storage: Save operation timed out after 30 seconds")
             return False
         except Exception as e:
-            _LOGGER.error("Storage: Error saving IR data: %s", e, exc_info=True)
+            _LOGGER.exception("Storage: Error saving IR data: %s", e)
             return False
     
-    async def _migrate_old_data(self) -> None:
-        """Migrate data from old ir_codes.json format."""
+    async def _migrate_old_data(self) -> Optional[Dict[str, Any]]:
+        """Migrate data from old ir_codes.json format.
+        
+        Called only when Storage is empty. Returns migrated data or None.
+        """
         try:
-            old_exists = await self.hass.async_add_executor_job(
-                lambda: self._old_data_file.exists()
-            )
-            
-            if not old_exists:
-                return
-            
-            # Check if we already have data in Storage
-            existing_data = await self.store.async_load()
-            if existing_data:
-                return  # Migration already done
+            # Single executor job for the whole read; a missing file means nothing to migrate
+            try:
+                old_content = await self.hass.async_add_executor_job(
+                    self._old_data_file.read_bytes
+                )
+            except FileNotFoundError:
+                return None
             
             _LOGGER.info("Migrating old IR codes data")
             
-            import json
-            import aiofiles
-            
-            # Read old file
-            async with aiofiles.open(self._old_data_file, 'r', encoding='utf-8') as f:
-                old_content = await f.read()
-            
-            old_data = json.loads(old_content)
+            # orjson parses bytes directly, without a str decode step
+            old_data = json_loads(old_content)
             
             # Convert to new format
             migrated_data = {
@@ -148,19 +168,20 @@ class IRRemoteStorage:
                 }
             
             # Save migrated data
-            self._data = migrated_data
-            await self.store.async_save(self._data)
+            await self.store.async_save(migrated_data)
             
             # Create backup of old file
             backup_path = self._old_data_file.with_suffix('.backup')
             await self.hass.async_add_executor_job(
-                lambda: self._old_data_file.rename(backup_path)
+                self._old_data_file.rename, backup_path
             )
             
             _LOGGER.info("Migration completed, backup saved: %s", backup_path)
+            return migrated_data
             
         except Exception as e:
             _LOGGER.warning("Migration failed, continuing with empty data: %s", e)
+            return None
     
     def _validate_name(self, name: str) -> bool:
         """Validate name according to rules."""
@@ -328,10 +349,16 @@ class IRRemoteStorage:
         return success
     
     def get_controllers(self) -> List[Dict[str, Any]]:
-        """Get list of all controllers."""
+        """Get list of all controllers.
+        
+        The list is built once and reused until the next save - callers must not modify it.
+        """
         if not self._loaded:
             return []
         
+        if self._controllers_summary is not None:
+            return self._controllers_summary
+        
         controllers = []
         for controller_id, controller_data in self._data.get("controllers", {}).items():
             controllers.append({
@@ -342,6 +369,7 @@ class IRRemoteStorage:
                 "device_count": len(controller_data.get("devices", {}))
             })
         
+        self._controllers_summary = controllers
         return controllers
     
     def get_controller(self, controller_id: str) -> Optional[Dict[str, Any]]:
@@ -368,7 +396,32 @@ class IRRemoteStorage:
             })
         
         return devices
-    
+
+    def get_devices_with_commands(self, controller_id: str) -> List[Dict[str, Any]]:
+        """Get list of devices for controller with their commands in a single pass."""
+        controller = self.get_controller(controller_id)
+        if not controller:
+            return []
+
+        devices = []
+        for device_id, device_data in controller.get("devices", {}).items():
+            commands = device_data.get("commands", {})
+            devices.append({
+                "id": device_id,
+                "name": device_data.get("name", "Unknown Device"),
+                "type": device_data.get("type", "light"),
+                "commands": [
+                    {
+                        "id": command_id,
+                        "name": command_data.get("name", "Unknown Command"),
+                        "code": command_data.get("code", "")
+                    }
+                    for command_id, command_data in commands.items()
+                ]
+            })
+
+        return devices
+
     def get_device(self, controller_id: str, device_id: str) -> Optional[Dict[str, Any]]:
         """Get device data."""
         controller = self.get_controller(controller_id)
@@ -387,29 +440,54 @@ class IRRemoteStorage:
             "commands": device_data.get("commands", {})
         }
     
+    def _get_device_data(self, controller_id: str, device_id: str) -> Optional[Dict[str, Any]]:
+        """Get raw stored device data without building a copy."""
+        controller = self.get_controller(controller_id)
+        if not controller:
+            return None
+        
+        return controller.get("devices", {}).get(device_id)
+    
     def get_commands(self, controller_id: str, device_id: str) -> List[Dict[str, Any]]:
         """Get list of commands for device."""
-        device = self.get_device(controller_id, device_id)
-        if not device:
+        device_data = self._get_device_data(controller_id, device_id)
+        if not device_data:
             return []
         
-        commands = []
-        for command_id, command_data in device.get("commands", {}).items():
-            commands.append({
+        return [
+            {
                 "id": command_id,
                 "name": command_data.get("name", "Unknown Command"),
                 "code": command_data.get("code", "")
-            })
+            }
+            for command_id, command_data in device_data.get("commands", {}).items()
+        ]
+    
+    def get_command_lookup(self, controller_id: str, device_id: str) -> Dict[str, str]:
+        """Get mapping of lowercase command ID to command ID for device.
+        
+        Cached until the next save so entities don't rebuild it on every command.
+        """
+        key = (controller_id, device_id)
+        lookup = self._command_lookups.get(key)
+        if lookup is not None:
+            return lookup
+        
+        device_data = self._get_device_data(controller_id, device_id)
+        if not device_data:
+            return {}
         
-        return commands
+        lookup = {command_id.lower(): command_id for command_id in device_data.get("commands", {})}
+        self._command_lookups[key] = lookup
+        return lookup
     
     def get_command_code(self, controller_id: str, device_id: str, command_id: str) -> Optional[str]:
         """Get IR code for specific command."""
-        device = self.get_device(controller_id, device_id)
-        if not device:
+        device_data = self._get_device_data(controller_id, device_id)
+        if not device_data:
             return None
         
-        command = device.get("commands", {}).get(command_id)
+        command = device_data.get("commands", {}).get(command_id)
         return command.get("code") if command else None
     
     async def async_export_data(self) -> Dict[str, Any]:
@@ -514,7 +592,7 @@ class IRRemoteStorage:
         
         # Generate new device ID if not provided
         if not new_device_id:
-            base_device_id = new_device_name.lower().replace(" ", "_").replace("-", "_")
+            base_device_id = name_to_id(new_device_name)
             new_device_id = base_device_id
             
             # Check for conflicts and add suffix if needed
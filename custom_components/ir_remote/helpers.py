@@ -0,0 +1,141 @@
+"""ZHA send, IR learning and reload helpers for IR Remote integration."""
+import logging
+import asyncio
+from typing import Any, Dict, Optional
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    DOMAIN,
+    DATA_ENTRIES,
+    DEFAULT_CLUSTER_TYPE,
+    DEFAULT_COMMAND_TYPE,
+    ZHA_COMMAND_SEND,
+    LEARN_POLL_INTERVAL,
+    LEARN_BASELINE_READ_TIMEOUT,
+    LEARN_TIMEOUT,
+    RELOAD_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def build_zha_send_base(controller: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the static part of the ZHA send command for a controller."""
+    return {
+        "ieee": controller["ieee"],
+        "endpoint_id": controller["endpoint_id"],
+        "cluster_id": controller["cluster_id"],
+        "cluster_type": DEFAULT_CLUSTER_TYPE,
+        "command": ZHA_COMMAND_SEND,
+        "command_type": DEFAULT_COMMAND_TYPE,
+    }
+
+
+@callback
+def async_schedule_entry_reload(hass: HomeAssistant, controller_id: str) -> None:
+    """Reload a controller entry shortly, coalescing a burst of changes into one reload."""
+    entry_data = hass.data[DOMAIN][DATA_ENTRIES].get(controller_id)
+    if entry_data is None:
+        # Entry is not loaded - nothing to coalesce with
+        hass.config_entries.async_schedule_reload(controller_id)
+        return
+    
+    reload_handle = entry_data.get("reload_handle")
+    if reload_handle is not None:
+        reload_handle.cancel()
+    entry_data["reload_handle"] = hass.loop.call_later(
+        RELOAD_DELAY, hass.config_entries.async_schedule_reload, controller_id
+    )
+
+
+async def async_fire_zha_code(hass: HomeAssistant, entry_data: Dict[str, Any], code: str) -> None:
+    """Send IR code through the controller's ZHA cluster."""
+    try:
+        # Send ZHA command (static part is prepared at entry setup)
+        async with entry_data["zha_semaphore"]:
+            await hass.services.async_call(
+                "zha",
+                "issue_zigbee_cluster_command",
+                {**entry_data["zha_send_base"], "params": {"code": code}},
+                blocking=True
+            )
+        _LOGGER.debug("IR code sent successfully")
+    except (HomeAssistantError, vol.Invalid) as e:
+        _LOGGER.error("Failed to send IR code: %s", e)
+        raise HomeAssistantError(f"Failed to send IR code: {e}") from e
+
+
+async def async_read_learned_code(hass: HomeAssistant, controller: Dict[str, Any]) -> Optional[str]:
+    """Read the IR code currently stored in attribute 0 of the controller."""
+    result = await hass.services.async_call(
+        "zha_toolkit",
+        "attr_read",
+        {
+            "ieee": controller["ieee"],
+            "endpoint": controller["endpoint_id"],
+            "cluster": controller["cluster_id"],
+            "attribute": 0,
+            "use_cache": False
+        },
+        blocking=True,
+        return_response=True
+    )
+    
+    _LOGGER.debug("ZHA toolkit response: %s", result)
+    
+    if result and "result_read" in result:
+        # result_read is a tuple: (dict_with_attributes, dict_with_other_data)
+        result_read = result["result_read"]
+        if isinstance(result_read, (list, tuple)) and len(result_read) > 0:
+            attributes_dict = result_read[0]
+            if isinstance(attributes_dict, dict) and attributes_dict.get(0):
+                return str(attributes_dict[0])
+    return None
+
+
+async def async_read_previous_code(hass: HomeAssistant, controller: Dict[str, Any]) -> Optional[str]:
+    """Read attribute 0 before learning starts, to tell a new code from the old one.
+    
+    A failed or slow read must not stop learning - None is returned and any
+    code read afterwards is accepted as new.
+    """
+    try:
+        async with asyncio.timeout(LEARN_BASELINE_READ_TIMEOUT):
+            return await async_read_learned_code(hass, controller)
+    except (HomeAssistantError, vol.Invalid, TimeoutError) as e:
+        _LOGGER.warning("Could not read previous IR code, accepting any learned code: %s", e)
+        return None
+
+
+async def async_wait_for_learned_code(
+    hass: HomeAssistant, controller: Dict[str, Any], previous_code: Optional[str]
+) -> Optional[str]:
+    """Poll attribute 0 until a newly learned IR code appears.
+    
+    Returns as soon as the attribute holds a code different from previous_code,
+    or None if no new code appeared within LEARN_TIMEOUT.
+    """
+    deadline = hass.loop.time() + LEARN_TIMEOUT
+    while True:
+        await asyncio.sleep(LEARN_POLL_INTERVAL)
+        remaining = deadline - hass.loop.time()
+        if remaining <= 0:
+            return None
+        
+        # A slow read must not push the wait past the deadline
+        try:
+            async with asyncio.timeout(remaining):
+                ir_code = await async_read_learned_code(hass, controller)
+        except TimeoutError:
+            return None
+        except (HomeAssistantError, vol.Invalid) as e:
+            # A single failed read is not fatal - keep polling until the deadline
+            _LOGGER.debug("IR code read failed, retrying: %s", e)
+            continue
+        
+        if ir_code and ir_code != previous_code:
+            return ir_code
@@ -1,6 +1,6 @@
 """Light platform for IR Remote integration."""
 import logging
-from typing import Any, Optional, List
+from typing import Any, Dict, Optional
 
 from homeassistant.components.light import (
     LightEntity,
@@ -8,23 +8,23 @@ from homeassistant.components.light import (
     ColorMode,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .helpers import async_fire_zha_code
 from .const import (
     DOMAIN,
-    ATTR_CONTROLLER_ID,
-    ATTR_DEVICE,
-    ATTR_COMMAND,
-    SERVICE_SEND_COMMAND,
+    DATA_ENTRIES,
     MANUFACTURER,
     MODEL_LIGHT,
     TRANSLATION_KEY_LIGHT,
-    DEVICE_TYPE_LIGHT,
     LIGHT_TYPES,
     POWER_ON_COMMANDS,
     POWER_OFF_COMMANDS,
+    SIGNAL_COMMAND_ADDED,
+    SIGNAL_DEVICE_ADDED,
 )
 from .data import IRRemoteStorage
 
@@ -37,10 +37,10 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up IR Remote light entities."""
-    _LOGGER.info("Setting up IR Remote lights for: %s", config_entry.title)
+    _LOGGER.debug("Setting up IR Remote lights for: %s", config_entry.title)
     
     # Get storage for this controller
-    entry_data = hass.data[DOMAIN].get(config_entry.entry_id)
+    entry_data = hass.data[DOMAIN][DATA_ENTRIES].get(config_entry.entry_id)
     if not entry_data:
         _LOGGER.error("No entry data found for %s", config_entry.entry_id)
         return
@@ -65,7 +65,7 @@ async def async_setup_entry(
         device_name = device["name"]
         device_type = device.get("type", "light")  # По умолчанию light
         
-        _LOGGER.info("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
+        _LOGGER.debug("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
         
         # Создаём Light entity только для типа Light
         if device_type in LIGHT_TYPES:
@@ -79,15 +79,42 @@ async def async_setup_entry(
                 device_id=device_id,
                 device_name=device_name,
                 storage=storage,
+                entry_data=entry_data,
             )
             lights.append(light)
             _LOGGER.debug("Created light entity for device %s", device_name)
     
-    _LOGGER.info("Created %d light entities for controller %s", len(lights), controller_id)
+    _LOGGER.debug("Created %d light entities for controller %s", len(lights), controller_id)
     
     # Add all lights
     async_add_entities(lights)
 
+    @callback
+    def _async_device_added(device_id: str) -> None:
+        """Create the light entity for a newly added device."""
+        device = storage.get_device(controller_id, device_id)
+        if not device or device["type"] not in LIGHT_TYPES:
+            return
+        
+        async_add_entities([
+            IRLight(
+                hass=hass,
+                config_entry=config_entry,
+                controller_id=controller_id,
+                device_id=device_id,
+                device_name=device["name"],
+                storage=storage,
+                entry_data=entry_data,
+            )
+        ])
+        _LOGGER.debug("Added light entity for device %s", device["name"])
+    
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_DEVICE_ADDED.format(controller_id), _async_device_added
+        )
+    )
+
 
 class IRLight(LightEntity):
     """Light entity for IR devices (гирлянды, ленты, лампы)."""
@@ -100,6 +127,7 @@ class IRLight(LightEntity):
         device_id: str,
         device_name: str,
         storage: IRRemoteStorage,
+        entry_data: Dict[str, Any],
     ) -> None:
         """Initialize the light."""
         self.hass = hass
@@ -108,6 +136,8 @@ class IRLight(LightEntity):
         self._device_id = device_id
         self._device_name = device_name
         self._storage = storage
+        # Per-entry ZHA send state, lives as long as the entity
+        self._entry_data = entry_data
         
         # Entity attributes
         self._attr_unique_id = f"{DOMAIN}_{controller_id}_{device_id}_light"
@@ -142,34 +172,51 @@ class IRLight(LightEntity):
         """Update effect list from available commands.
         
         Excludes power commands (on/off) as they are handled by turn_on/turn_off methods.
+        Called on init and whenever a command is added to this device.
         """
         commands = self._storage.get_commands(self._controller_id, self._device_id)
         
         # Фильтруем команды питания - они не должны быть в эффектах
         all_power_commands = set(POWER_ON_COMMANDS + POWER_OFF_COMMANDS)
         
-        self._attr_effect_list = [
-            command["name"] for command in commands  # Используем name, не id!
+        # Effect name -> command ID, so turn_on resolves an effect with one lookup
+        self._effect_commands = {
+            command["name"]: command["id"] for command in commands  # Используем name, не id!
             if command["id"].lower() not in all_power_commands
-        ]
+        }
+        self._attr_effect_list = list(self._effect_commands)
+        self._attr_extra_state_attributes = {
+            "device_id": self._device_id,
+            "controller_id": self._controller_id,
+            "device_type": "light",
+            "available_effects": len(self._attr_effect_list),
+        }
         
         _LOGGER.debug("Updated effect list for %s: %s (filtered out power commands)", 
                      self._device_name, self._attr_effect_list)
     
-    def _find_command_by_name(self, effect_name: str) -> Optional[str]:
-        """Find command ID by effect name."""
-        commands = self._storage.get_commands(self._controller_id, self._device_id)
-        
-        for command in commands:
-            if command["name"] == effect_name:
-                return command["id"]
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to command additions for this device."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_COMMAND_ADDED.format(self._controller_id),
+                self._async_command_added,
+            )
+        )
+    
+    @callback
+    def _async_command_added(self, device_id: str, command_id: str) -> None:
+        """Refresh derived state when a command is added to this device."""
+        if device_id != self._device_id:
+            return
         
-        return None
+        self._update_effect_list()
+        self.async_write_ha_state()
     
     def _find_command(self, command_names: list) -> Optional[str]:
         """Find command from available commands."""
-        commands = self._storage.get_commands(self._controller_id, self._device_id)
-        available_commands = {cmd["id"].lower(): cmd["id"] for cmd in commands}
+        available_commands = self._storage.get_command_lookup(self._controller_id, self._device_id)
         
         for cmd_name in command_names:
             if cmd_name.lower() in available_commands:
@@ -177,13 +224,6 @@ class IRLight(LightEntity):
         
         return None
     
-    @property
-    def effect_list(self) -> Optional[List[str]]:
-        """Return the list of supported effects (эффекты/режимы)."""
-        # Обновляем список при каждом запросе на случай если команды изменились
-        self._update_effect_list()
-        return self._attr_effect_list
-    
     @property
     def effect(self) -> Optional[str]:
         """Return the current effect (текущий эффект)."""
@@ -205,17 +245,12 @@ class IRLight(LightEntity):
         
         if effect:
             # Включение с конкретным эффектом
-            _LOGGER.info("Turning on %s with effect '%s'", self._device_name, effect)
-            
-            # Проверяем что эффект существует
-            if effect not in self.effect_list:
-                _LOGGER.warning("Effect '%s' not found in available effects for %s", effect, self._device_name)
-                return
+            _LOGGER.debug("Turning on %s with effect '%s'", self._device_name, effect)
             
             # Находим ID команды по названию эффекта
-            command_id = self._find_command_by_name(effect)
+            command_id = self._effect_commands.get(effect)
             if not command_id:
-                _LOGGER.warning("Command not found for effect '%s'", effect)
+                _LOGGER.warning("Effect '%s' not found in available effects for %s", effect, self._device_name)
                 return
             
             # Отправляем команду
@@ -230,7 +265,7 @@ class IRLight(LightEntity):
                          self._device_name, effect, command_id)
         else:
             # Простое включение (без эффекта)
-            _LOGGER.info("Turning on %s (no effect specified)", self._device_name)
+            _LOGGER.debug("Turning on %s (no effect specified)", self._device_name)
             
             power_command = self._find_command(POWER_ON_COMMANDS)
             
@@ -239,13 +274,13 @@ class IRLight(LightEntity):
                 self._attr_is_on = True
                 # Эффект остаётся тем же или None
                 self.async_write_ha_state()
-                _LOGGER.info("Sent power on command: %s", power_command)
+                _LOGGER.debug("Sent power on command: %s", power_command)
             else:
                 _LOGGER.warning("No power on command found for %s", self._device_name)
     
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the light off."""
-        _LOGGER.info("Turning off %s", self._device_name)
+        _LOGGER.debug("Turning off %s", self._device_name)
         
         power_command = self._find_command(POWER_OFF_COMMANDS)
         
@@ -254,7 +289,7 @@ class IRLight(LightEntity):
             self._attr_is_on = False
             # Эффект остаётся в памяти (для повторного включения)
             self.async_write_ha_state()
-            _LOGGER.info("Sent power off command: %s", power_command)
+            _LOGGER.debug("Sent power off command: %s", power_command)
         else:
             _LOGGER.warning("No power off command found for %s", self._device_name)
     
@@ -262,28 +297,15 @@ class IRLight(LightEntity):
         """Send IR command."""
         _LOGGER.debug("Sending command '%s' to device %s", command, self._device_name)
         
+        code = self._storage.get_command_code(self._controller_id, self._device_id, command)
+        if not code:
+            _LOGGER.error("Command code not found: %s - %s", self._device_id, command)
+            return
+        
         try:
-            await self.hass.services.async_call(
-                DOMAIN,
-                SERVICE_SEND_COMMAND,
-                {
-                    ATTR_CONTROLLER_ID: self._controller_id,
-                    ATTR_DEVICE: self._device_id,
-                    ATTR_COMMAND: command,
-                },
-                blocking=True
-            )
+            # Send directly via ZHA, without a send_command service round-trip
+            await async_fire_zha_code(self.hass, self._entry_data, code)
             _LOGGER.debug("Successfully sent command %s", command)
             
         except Exception as e:
             _LOGGER.error("Failed to send command %s: %s", command, e)
-    
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
-        """Return extra state attributes."""
-        return {
-            "device_id": self._device_id,
-            "controller_id": self._controller_id,
-            "device_type": "light",
-            "available_effects": len(self._attr_effect_list or []),
-        }
\ No newline at end of file
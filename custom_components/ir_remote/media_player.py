@@ -1,6 +1,6 @@
 """Media Player platform for IR Remote integration."""
 import logging
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 from homeassistant.components.media_player import (
     MediaPlayerEntity,
@@ -8,16 +8,15 @@ from homeassistant.components.media_player import (
     MediaPlayerState,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .helpers import async_fire_zha_code
 from .const import (
     DOMAIN,
-    ATTR_CONTROLLER_ID,
-    ATTR_DEVICE,
-    ATTR_COMMAND,
-    SERVICE_SEND_COMMAND,
+    DATA_ENTRIES,
     MANUFACTURER,
     MODEL_MEDIA_PLAYER,
     TRANSLATION_KEY_MEDIA_PLAYER,
@@ -27,6 +26,7 @@ from .const import (
     MEDIA_PLAYER_TYPES,
     POWER_ON_COMMANDS,
     POWER_OFF_COMMANDS,
+    SIGNAL_DEVICE_ADDED,
 )
 from .data import IRRemoteStorage
 
@@ -39,10 +39,10 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up IR Remote media player entities."""
-    _LOGGER.info("Setting up IR Remote media players for: %s", config_entry.title)
+    _LOGGER.debug("Setting up IR Remote media players for: %s", config_entry.title)
     
     # Get storage for this controller
-    entry_data = hass.data[DOMAIN].get(config_entry.entry_id)
+    entry_data = hass.data[DOMAIN][DATA_ENTRIES].get(config_entry.entry_id)
     if not entry_data:
         _LOGGER.error("No entry data found for %s", config_entry.entry_id)
         return
@@ -67,7 +67,7 @@ async def async_setup_entry(
         device_name = device["name"]
         device_type = device.get("type", "light")
         
-        _LOGGER.info("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
+        _LOGGER.debug("Processing device: %s (%s) - type: %s", device_name, device_id, device_type)
         
         # Создаём Media Player только для специализированных типов (TV, Audio, Projector)
         # Light устройства используют свою платформу!
@@ -83,15 +83,43 @@ async def async_setup_entry(
                 device_name=device_name,
                 device_type=device_type,
                 storage=storage,
+                entry_data=entry_data,
             )
             media_players.append(media_player)
             _LOGGER.debug("Created media player for device %s", device_name)
     
-    _LOGGER.info("Created %d media player entities for controller %s", len(media_players), controller_id)
+    _LOGGER.debug("Created %d media player entities for controller %s", len(media_players), controller_id)
     
     # Add all media players
     async_add_entities(media_players)
 
+    @callback
+    def _async_device_added(device_id: str) -> None:
+        """Create the media player for a newly added device."""
+        device = storage.get_device(controller_id, device_id)
+        if not device or device["type"] not in MEDIA_PLAYER_TYPES:
+            return
+        
+        async_add_entities([
+            IRMediaPlayer(
+                hass=hass,
+                config_entry=config_entry,
+                controller_id=controller_id,
+                device_id=device_id,
+                device_name=device["name"],
+                device_type=device["type"],
+                storage=storage,
+                entry_data=entry_data,
+            )
+        ])
+        _LOGGER.debug("Added media player for device %s", device["name"])
+    
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_DEVICE_ADDED.format(controller_id), _async_device_added
+        )
+    )
+
 
 class IRMediaPlayer(MediaPlayerEntity):
     """Media Player entity for IR devices (TV, Audio, Projector)."""
@@ -105,6 +133,7 @@ class IRMediaPlayer(MediaPlayerEntity):
         device_name: str,
         device_type: str,
         storage: IRRemoteStorage,
+        entry_data: Dict[str, Any],
     ) -> None:
         """Initialize the media player."""
         self.hass = hass
@@ -114,12 +143,20 @@ class IRMediaPlayer(MediaPlayerEntity):
         self._device_name = device_name
         self._device_type = device_type
         self._storage = storage
+        # Per-entry ZHA send state, lives as long as the entity
+        self._entry_data = entry_data
         
         # Entity attributes
         self._attr_unique_id = f"{DOMAIN}_{controller_id}_{device_id}_player"
         self._attr_name = device_name
         self._attr_translation_key = TRANSLATION_KEY_MEDIA_PLAYER
         self._attr_should_poll = False
+        self._attr_extra_state_attributes = {
+            "device_id": device_id,
+            "controller_id": controller_id,
+            "device_type": device_type,
+        }
+        self._attr_icon = self._icon_for_type(device_type)
         
         # Device info - link to the same virtual device as buttons
         self._attr_device_info = DeviceInfo(
@@ -168,8 +205,7 @@ class IRMediaPlayer(MediaPlayerEntity):
     
     def _find_command(self, command_names: list) -> Optional[str]:
         """Find command from available commands."""
-        commands = self._storage.get_commands(self._controller_id, self._device_id)
-        available_commands = {cmd["id"].lower(): cmd["id"] for cmd in commands}
+        available_commands = self._storage.get_command_lookup(self._controller_id, self._device_id)
         
         for cmd_name in command_names:
             if cmd_name.lower() in available_commands:
@@ -197,21 +233,21 @@ class IRMediaPlayer(MediaPlayerEntity):
         """Return if entity is available."""
         return True
     
-    @property
-    def icon(self) -> str:
-        """Return the icon for the media player."""
-        if self._device_type == DEVICE_TYPE_TV:
+    @staticmethod
+    def _icon_for_type(device_type: str) -> str:
+        """Return the icon for a device type."""
+        if device_type == DEVICE_TYPE_TV:
             return "mdi:television"
-        elif self._device_type == DEVICE_TYPE_AUDIO:
+        elif device_type == DEVICE_TYPE_AUDIO:
             return "mdi:speaker"
-        elif self._device_type == DEVICE_TYPE_PROJECTOR:
+        elif device_type == DEVICE_TYPE_PROJECTOR:
             return "mdi:projector"
         else:
             return "mdi:remote"
     
     async def async_turn_on(self) -> None:
         """Turn the media player on."""
-        _LOGGER.info("Turning on media player: %s", self._device_name)
+        _LOGGER.debug("Turning on media player: %s", self._device_name)
         
         power_command = self._find_command(POWER_ON_COMMANDS)
         if not power_command:
@@ -221,13 +257,13 @@ class IRMediaPlayer(MediaPlayerEntity):
             await self._send_command(power_command)
             self._state = MediaPlayerState.IDLE
             self.async_write_ha_state()
-            _LOGGER.info("Sent power on command: %s", power_command)
+            _LOGGER.debug("Sent power on command: %s", power_command)
         else:
             _LOGGER.warning("No power on command found for %s", self._device_name)
     
     async def async_turn_off(self) -> None:
         """Turn the media player off."""
-        _LOGGER.info("Turning off media player: %s", self._device_name)
+        _LOGGER.debug("Turning off media player: %s", self._device_name)
         
         power_command = self._find_command(POWER_OFF_COMMANDS)
         if not power_command:
@@ -237,7 +273,7 @@ class IRMediaPlayer(MediaPlayerEntity):
             await self._send_command(power_command)
             self._state = MediaPlayerState.IDLE
             self.async_write_ha_state()
-            _LOGGER.info("Sent power off command: %s", power_command)
+            _LOGGER.debug("Sent power off command: %s", power_command)
         else:
             _LOGGER.warning("No power off command found for %s", self._device_name)
     
@@ -329,27 +365,15 @@ class IRMediaPlayer(MediaPlayerEntity):
         """Send IR command."""
         _LOGGER.debug("Sending command '%s' to device %s", command, self._device_name)
         
+        code = self._storage.get_command_code(self._controller_id, self._device_id, command)
+        if not code:
+            _LOGGER.error("Command code not found: %s - %s", self._device_id, command)
+            return
+        
         try:
-            await self.hass.services.async_call(
-                DOMAIN,
-                SERVICE_SEND_COMMAND,
-                {
-                    ATTR_CONTROLLER_ID: self._controller_id,
-                    ATTR_DEVICE: self._device_id,
-                    ATTR_COMMAND: command,
-                },
-                blocking=True
-            )
+            # Send directly via ZHA, without a send_command service round-trip
+            await async_fire_zha_code(self.hass, self._entry_data, code)
             _LOGGER.debug("Successfully sent command %s", command)
             
         except Exception as e:
             _LOGGER.error("Failed to send command %s: %s", command, e)
-    
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
-        """Return extra state attributes."""
-        return {
-            "device_id": self._device_id,
-            "controller_id": self._controller_id,
-            "device_type": self._device_type,
-        }
\ No newline at end of file